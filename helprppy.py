@@ -1291,6 +1291,58 @@ ex> len .               # the lenght is 6, as the sublist counts as a single
 ex>
 ~~~
   See "pkern" for the words concerning list manipulation
+
+  Lists of numbers can be turned into vectors by "vec", to compute on all their
+items with one word instead of a loop: "v+ v- v* v/" work item by item on two
+vectors of same length, or on a vector and a number; "v< v> v<= v>= v== v!="
+give masks of 1/0 selecting items with "vsel"; "vdot" is the dot product and
+"vcumsum" the cumulative sums. "sum", "min", "max" and "len" accept vectors,
+"vlist" turns a vector back to a list. Vectors are NumPy arrays if NumPy is
+installed, arrays of Python's module array otherwise; a variable holding a
+vector must get a list back before "save".
+~~~
+ex> [1,2,3,4] vec 10 v* .
+ Data stack items: 1
+[array('q', [10, 20, 30, 40])]
+ex> dup 25 v> vsel vlist .  # items > 25
+ Data stack items: 1
+[[30, 40]]
+ex>
+~~~
+
+  "map", "filter", "fold" and "each" run a definition, given by its index
+"*name", on each item of a list (or tuple, dictionary, set, string, range,
+vector) without a loop: "map" collects the result of each run, "filter" keeps
+the items for which the word gives true, "fold" starts from an initial value
+and runs the word on it and each item ( acc item -- acc ), "each" just runs the
+word on each item pushed.
+~~~
+ex> sq: dup * ;
+ex> [1,2,3,4] *sq map .
+ Data stack items: 1
+[[1, 4, 9, 16]]
+ex> add: + ;
+ex> 0 *add fold .
+ Data stack items: 1
+[30]
+ex>
+~~~
+
+  Iterators give their items one at a time, when taken, instead of building
+a whole list on the stack: "range" ( start stop step -- iter ) counts lazily,
+"iter" turns a list, tuple, set, string, dictionary (its (key,value) pairs) or
+file handle (its lines) into an iterator. "next" leaves the next item with
+ZF=1, or only sets ZF=0 when the iterator is exhausted, for "begin ... while
+... repeat" loops. "take", "zip", "chain", "enumerate", "map" and "filter" of
+iterators are iterators too; "ilist", "iset" and "idict" drain the items left
+into a list, set or dictionary. "each" and "fold" run a word on the items
+as they come, so big files or ranges are processed at constant memory.
+~~~
+ex> 0 1000000000 1 range *sq map 4 take ilist .
+ Data stack items: 1
+[[0, 1, 4, 9]]
+ex>
+~~~
   
 === End of chapter 6 === 
 """
@@ -1765,6 +1817,36 @@ ex>
   Beware that the word defining the body must be prefixed with "*", 
 to obtain it's index, as needed by i-j-k-loop.  
 
+  The compiler words below build loops in a single definition, or even 
+in an execution line; they are compiled to direct branches, so they are 
+the fastest way to loop:
+  - do ( limit start -- ) ... loop : counted loop, index I from start 
+    to limit-1, the body is skipped if start >= limit; in nested loops 
+    "i" is the index of the innermost loop, "j" and "k" of the enclosing 
+    ones; I, J, K are restored at loop end. No ";" inside "do ... loop"
+  - begin ... until : loop until ZF == 1 at "until"
+  - begin ... while ... repeat : loop as long as ZF == 1 at "while"
+~~~
+ex> 10 1 + 1 do i print loop .
+1
+2
+...
+10
+ Data stack empty
+ex> while-loop: begin !=0 while dup print -- repeat " while ended" print ; .
+ Data stack empty
+ex> 3 while-loop .
+3
+2
+1
+while ended
+ Data stack items: 1
+[0]
+ex>
+~~~
+  As "do loop begin until while repeat" are compiler words, they can't 
+be used as names of definitions.
+
   9.4 Switching
   -------------
  
@@ -2268,9 +2350,25 @@ ex>
   buffering=-1, encoding=None, errors=None, newline=None, closefd=True,
   opener=None ; only filename and filemode are taken into account.
   Also modes "r" and "t" which are default on Python, must be specified
+  "openbuf" takes a third argument, the buffer size in bytes (0 unbuffered,
+  binary mode only).
   
   NB3. All examples are validated for Windows, working with paths is a 
   little different in Linux and MacOS
+
+  Files larger than memory are read piece by piece, not by "read" or
+"readlines": "lines" gives an iterator over the lines of the file without
+their line breaks, "chunks" one over pieces of a given size (chars, or bytes
+in binary mode). The lines are read through the file buffer as they are taken,
+by "next" in a loop or by a word applied to each one (see "Iterators" at the
+end of chapter 6):
+~~~
+ex> cnt: drop 1 + ;
+ex> 'big.log 'r 1048576 openbuf lines 0 *cnt fold .
+ Data stack items: 1
+[1000000]
+ex> 'big.log 'rb open 65536 chunks *process each .
+~~~
   
 === End of chapter 11 ===
 
@@ -2457,6 +2555,30 @@ ex>
   - choose ( idx1 idx2 -- ) if ZF=1 execute word with idx1, else idx2
   See "Control Flow"
   
+  - closon ( -- ) switch closure compiled execution of definitions to ON
+  - closoff ( -- ) switch closure compiled execution of definitions to OFF
+  With "closon", every definition is compiled at its first call into a 
+  chain of Python closures and executed afterwards with a single call, 
+  without walking the execution list. Results and abort messages are 
+  the same; definitions using "execidx", "choose", "iloop" & co. (or 
+  calling such definitions) run as before.
+~~~
+ex> closon .
+ Data stack empty
+ex> 100000 countdown .
+ Data stack items: 1
+[0]
+ex>
+~~~
+
+  - regon ( -- ) switch closures ON, with top of stack kept in a register
+  - regoff ( -- ) switch top of stack register OFF
+  With "regon", a sequence of stack, math and comparison words and
+  literals, without branch, is compiled into a single Python function
+  keeping the top of stack in a variable. The stack is written back at
+  the end of the sequence, so "pds", "jsdump" and abort messages see it
+  as usual.
+
   - enumerate ( seq -- list ) list of tuples (count,value) iterating over seq
 ~~~
 ex> 'abcd enumerate .
@@ -2487,9 +2609,11 @@ ex> 2 3 10 20 + * swap / .
 [45.0, 45.0, 45.0, 45.0]
 ex>
 ~~~
-  NB. RPPy uses Python's eval as input in the Read-Eval-Print-Loop, par 
-  consequence any valid Python expression containing only number/string values
-  can be evaluated, using infix notation and known precedence rules. But using
+  NB. RPPy evaluates as a Python expression any input which is not a word,
+  par consequence any valid Python expression containing only number/string
+  values can be evaluated, using infix notation and known precedence rules.
+  Only literals, operators and comparisons are accepted: function calls
+  as len("abc") are rejected, nothing of the input is executed. But using
   variables, as in Python, doesn't work, a=10; b=20; eval("a+b") is a valid 
   Python expression and a rejected RPPy one:
 ~~~
@@ -2704,15 +2828,77 @@ in the current directory.
 also Ctrl-S has to be pressed only at start of line input. Use "s." as an 
 alternative where Ctrl-S poses problems.
 
+  The file is a binary image of the execution list and the dictionary of
+definitions: literals keep their type ( tuples, sets, complex numbers ... ), 
+and a checksum detects a damaged file at loading.
+
+  - journal ( filename -- ) save RPPy user generated words to filename,
+only the changes appended to its journal
+  Where "save" writes again all definitions, "journal" appends to file
+"filename.rpj" only what changed since the last save or load of
+"filename.rpp": new definitions, new values of variables, definitions
+replaced or deleted. "load" reads the image, then replays its journal.
+"s." and Ctrl-S save the same way to "tempsave.rpp" and "tempsave.rpj".
+  When the image is not the one of the last save or load, or when the
+journal would grow bigger than the image, a new image is written instead
+and the journal deleted; "save" always writes a new image. A journal
+damaged by a crash while saving is loaded up to the last complete change.
+~~~
+ex> 'mywords load .
+  Definitions loaded:
+    0 w1
+    1 w2
+    2 w3
+ Data stack empty
+ex> sq: dup * ; .
+ Data stack empty
+ex> 'mywords journal .
+Saved: 4 definitions to mywords.rpj
+ Data stack empty
+~~~
+
   Loading definitions is done by:
   - load ( filename -- ) load RPPy user generated words from filename
   As with "save", the filename must be without extension, as 
-only files of type .rpp are recognized.
+only files of type .rpp are recognized. Files saved in text (JSON) format
+by older versions of RPPy are loaded as well.
   Loading always overwrites all existing definitions, if any, there's no
 concept of overlays in RPPy. You start at beginning with an empty dictionary,
 then create a first set of definitions; save them, and from now on, at each
 working session load them first and continue adding other definitions until
 finishing the application.
+  - library ( filename -- ) make the words of filename known, each one loaded
+when first used
+  A shared set of definitions saved by "save" can instead be used as a library:
+"library" reads only the names of its words and adds nothing to the dictionary.
+The first time a word of the library is compiled, its definition and the ones it
+uses are loaded from the file and added to the dictionary; a script using a few
+words of a big library loads only these. The existing definitions are kept, and
+a definition of the same name made by the user is used instead of the library's.
+~~~
+ex> 'mathlib library .
+  Library words indexed: 2500
+ Data stack empty
+ex> 3 cube print .
+27
+ Data stack empty
+~~~
+  - require ( filename -- ) append the words of filename not defined yet,
+unless already done
+  Where "load" replaces all definitions, "require" adds the ones of a library
+to the existing ones, so that modules saved apart can be combined. A word
+of the library already defined is not added, and the library words using it
+use the existing definition: two modules saved with the same base words share
+one copy of them. Requiring a library a second time does nothing.
+~~~
+ex> 'geometry require 'finance require .
+  Library words linked: 42 ; already defined: 0
+  Library words linked: 37 ; already defined: 12
+ Data stack empty
+ex> 'geometry require .
+  Library already loaded: geometry.rpp
+ Data stack empty
+~~~
   A very important issue about variables (which are also definitions): at 
 save, always their LAST VALUE is written on file, from this point of view 
 RPPy works like a spreadsheet: what you have in the cells at saving will be 
@@ -2873,6 +3059,115 @@ ex> 'w1 refdef .
 [['w2', 'w3', 'w4']]
 ex>
 ~~~
+
+  Old variants of a redefined word, and words deleted by "deldef", remain
+in the execution list as long as other definitions use them. When they are
+no longer used, "compact" removes them and shortens the execution list,
+and so the saved files; indexes of words ( "*name" ) compiled in
+definitions are updated, but not the ones already pushed on the stacks or
+stored in variables.
+  - compact ( -- ) remove old definitions no longer used from the execution list
+~~~
+ex> drop 'w1 deldef .
+"w1" at index 16 deleted
+ Data stack empty
+ex> compact .
+  Removed 1 unreachable definitions, 4 entries ; ExecList from 34 to 30 entries
+ Data stack empty
+ex>
+~~~
+
+  Definitions are optimised when "." ends their compilation: sequences of
+numeric literals and math words are computed once ( "2 3 + 4 *" is compiled
+as "20" ), pairs "dup drop" and "swap swap" are removed, and "then" leaves
+no entry in the execution list. So "pdef" and "pexlst" show the optimised
+code:
+~~~
+ex> f1: 2 3 + 4 * ; .
+ Data stack empty
+ex> 'f1 pdef .
+  f1          at index:  2 ""  ""
+  f1: 20 ; 
+
+  No duplicate (older definitions) present
+ Data stack empty
+ex>
+~~~
+  A literal followed by "+ - * == != < > <= >=" is compiled as a single
+entry executing both words, shown by "pexlst" as "lit  1 +"; "pdef" and
+"save" keep the original words.
+
+  A call to a short definition without "if/ifz/ifneq", of maximum 3 entries,
+is replaced at compile time by a copy of its body. "pdef", "refdef" and 
+"repdef" see the inlined word as a call. Variables are never inlined.
+  - inline ( -- ) in a definition: inline it at call sites, whatever its size
+  - inlinemax ( n -- ) inline definitions up to n entries, 0 = only marked by "inline"
+~~~
+ex> sq: inline dup * ; .
+ Data stack empty
+ex> f: sq 1 + ; .
+ Data stack empty
+ex> 'f pdef .
+  f           at index:  6 ""  ""
+  f: sq 1 + ; 
+
+  No duplicate (older definitions) present
+ Data stack empty
+ex>
+~~~
+
+  The stack effect of each definition is then checked from the signatures
+of the words it uses: the number of items it needs, and the number it
+leaves, must be the same on every path ( both ways of "if", loops ).
+A definition so verified runs its stack, math and comparison words without
+testing the stack depth or the types of items; if they are wrong when it is
+called, the word aborts as usual.
+  - effect ( defname -- ) print the stack effect of defname, if verified
+~~~
+ex> sq: dup * ; .
+ Data stack empty
+ex> 'sq effect .
+sq ( 1 -- 1 )
+ Data stack empty
+ex>
+~~~
+
+  - transpile ( filename -- ) transpile RPPy user generated words to python module filename.py
+  Every definition becomes a Python function working on the data stack
+of RPPy: "if/ifz/ifneq ... then" are translated to Python "if" statements,
+tail calls of a word to itself to loops. The module can be imported 
+from Python without the REPL; at import, it installs its definitions 
+in RPPy as "load" does. The same is done from the command line for a
+file saved before, without starting the REPL:
+  >python rppy.py -t filename
+~~~
+ex> 'mywords transpile .
+Transpiled: 12 words to mywords.py
+ Data stack empty
+ex>
+~~~
+  And in Python:
+~~~
+>>> import mywords
+>>> mywords.vm.dpush(5)
+>>> mywords.fact()
+>>> mywords.vm.dstack
+[120]
+>>>
+~~~
+
+  Scripts, text files of RPPy input lines, run without the REPL:
+  >python rppy.py -f script
+  >python rppy.py < script
+  >cat script | python rppy.py
+  Lines are read one at a time, as typed at the prompt, but without
+prompts, welcome text and data stack printing ("pds" or "pdson" in the
+script to see it). At end of script, what remains is executed and RPPy
+exits with code 0; at the first compile error or abort, the message is
+printed and RPPy exits with code 1, giving the line of the script. "quit"
+ends the script without asking. To use the REPL with input not coming
+from a terminal:
+  >python rppy.py -i
   
 === End of chapter 14 ===
  
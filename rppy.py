@@ -12,7 +12,27 @@ vermm = 11      # version month
 #============================
 # import area
 import json
+import ast
+import keyword
+import operator
+import re
+import functools
+import copy
+import bisect
+import os
+import marshal
+import mmap
+import struct
+import zlib
+from array import array
+from itertools import compress, accumulate, repeat, islice, chain
+from collections.abc import Iterator
+import sys
 import helprppy as h
+try:
+    import numpy            # optional: vectors are then NumPy arrays, else arrays of module array
+except ImportError:
+    numpy = None
 #
 #============================
 #   Description of the RPPy VM (Virtual Machine) & associated dictionaries
@@ -204,6 +224,10 @@ KernDef = {
             'del[:j]':      ['k_deljstart()','( list -- list ) delete slice from start until J'],
             'del[i][j]':    ['k_delijsecond()','( list -- list ) delete item at J from item at I'],
             'del[i][j][k]': ['k_delijkthird()','( list -- list ) delete item at K from item at J from item at I'],
+            'map':          ['k_map()','( seq idx -- list ) list of the results of word with index idx ( item -- x ) on each item, an iterator if seq is one'],
+            'filter':       ['k_filter()','( seq idx -- list ) list of the items for which word with index idx ( item -- flag ) gives true, an iterator if seq is one'],
+            'fold':         ['k_fold()','( seq init idx -- acc ) acc = init, then acc = word with index idx ( acc item -- acc ) on each item'],
+            'each':         ['k_each()','( seq idx -- ... ) execute word with index idx on each item pushed'],
 # Dictionary words
             '###11':        ['k_pass()','  ===Dictionary words==='],
             'dict':         ['k_dict()','( str -- dict ) create dictionary from str '],
@@ -289,10 +313,13 @@ KernDef = {
 # File I/O words
             '###15':        ['k_pass()','  ===File I/O words==='],
             'open':         ['k_open()','( filename filemode -- filehandle ) open filename with given filemode'],
+            'openbuf':      ['k_openbuf()','( filename filemode size -- filehandle ) open filename with given filemode & a buffer of size bytes'],
             'read':         ['k_read()','( filehandle -- filecontent ) read whole file'],
             'readline':     ['k_readline()','( filehandle -- linecontent ) read a single line from file'],
             'readlines':    ['k_readlines()','( filehandle -- list ) read all lines into list'],
             'readsize':     ['k_readsize()','( filehandle size -- sizecontent ) read size bytes from file'],
+            'lines':        ['k_lines()','( filehandle -- iter ) iterator over the lines of file, line breaks removed, read as taken'],
+            'chunks':       ['k_chunks()','( filehandle size -- iter ) iterator over the pieces of size chars (bytes in binary mode) of file'],
             'seek':         ['k_seek()','( filehandle offset origin -- n ) file content pointer n = origin+offset'],
             'tell':         ['k_tell()','( filehandle -- n ) n = current pointer in file'],
             'write':        ['k_write()','( filehandle str -- n ) write str to file, n= nb. of chars written'],
@@ -309,9 +336,15 @@ KernDef = {
             'edit':         ['k_edit()','( defname -- ) edit definition defname'],
             'refdef':       ['k_refdef()','( defname -- list ) list of all definitions including a reference to defname'],
             'repdef':       ['k_repdef()','( defname -- ) replace old definitions of defname with the last one defined'],
+            'effect':       ['k_effect()','( defname -- ) print the stack effect of defname, if verified'],
+            'compact':      ['k_compact()','( -- ) remove old definitions no longer used from the execution list'],
             'load':         ['k_load()','( filename -- ) load RPPy user generated words from filename'],
             'save':         ['k_save()','( filename -- ) save RPPy user generated words to filename'],
-            's.':           ['k_sdot()','( -- ) save RPPy user generated words to file "tempsave.rpp"'],
+            's.':           ['k_sdot()','( -- ) save RPPy user generated words to file "tempsave.rpp", changes appended to "tempsave.rpj"'],
+            'journal':      ['k_journal()','( filename -- ) save RPPy user generated words to filename, changes appended to its journal'],
+            'library':      ['k_library()','( filename -- ) make the words of filename known, each one loaded when first used'],
+            'require':      ['k_require()','( filename -- ) append the words of filename not defined yet, unless already done'],
+            'transpile':    ['k_transpile()','( filename -- ) transpile RPPy user generated words to python module filename.py'],
 # Miscellaneous words
             '###18':        ['k_pass()','  ===Miscellaneous words==='],
             'abort':        ['k_abort()','( str -- ) print abort message str, switch to REPL'],
@@ -321,8 +354,13 @@ KernDef = {
             'chr':          ['k_chr()','( n -- strchr ) convert integer n to string representing associated glyph'],
             'complex':      ['k_complex()','( str -- n ) convert str to complex number n'],
             'choose':       ['k_choose()','( idx1 idx2 -- ) if ZF=1 execute word with idx1, else idx2'],
+            'closon':       ['k_closon()','( -- ) switch closure compiled execution of definitions to ON'],
+            'closoff':      ['k_closoff()','( -- ) switch closure compiled execution of definitions to OFF'],
+            'regon':        ['k_regon()','( -- ) switch closures ON, with top of stack kept in a register'],
+            'regoff':       ['k_regoff()','( -- ) switch top of stack register OFF'],
+            'inlinemax':    ['k_inlinemax()','( n -- ) inline definitions up to n entries at call sites, 0 = only marked by "inline"'],
 #            'dellast':      ['k_dellast()','( -- ) delete last definition declared'],
-            'enumerate':    ['k_enumerate()','( seq -- list ) list of tuples (count,value) iterating over seq'],
+            'enumerate':    ['k_enumerate()','( seq -- list ) list of tuples (count,value) iterating over seq, an iterator if seq is one'],
             'eval':         ['k_evaluate()','( str -- item ) TOS = eval(str)'],
             'execidx':      ['k_execidx()','( idx -- ) execute word with index idx'],
             'exec':         ['k_exec()','( str -- ... ) exec(str), stack depends of what exec does'],
@@ -340,7 +378,35 @@ KernDef = {
             'ord':          ['k_ord()','( strchr -- n ) convert string representing one character to integer n'],
             'quit':         ['k_quit()','( ... -- ... ) end execution of RPPy'],
             'str':          ['k_str()','( item -- str ) return a string interpretation of item'],
-            'type':         ['k_type()','( item -- itemtype ) TOS = type of item']
+            'type':         ['k_type()','( item -- itemtype ) TOS = type of item'],
+# Vector words
+            '###19':        ['k_pass()','  ===Vector words==='],
+            'vec':          ['k_vec()','( seq -- vec ) numeric vector of the numbers in seq'],
+            'vlist':        ['k_vlist()','( vec -- list ) list of the numbers in vector vec'],
+            'v+':           ['k_vplus()','( x y -- v ) add item by item, x or y a vector, the other a vector or a number'],
+            'v-':           ['k_vminus()','( x y -- v ) subtract item by item, x or y a vector, the other a vector or a number'],
+            'v*':           ['k_vstar()','( x y -- v ) multiply item by item, x or y a vector, the other a vector or a number'],
+            'v/':           ['k_vslash()','( x y -- v ) divide item by item, x or y a vector, the other a vector or a number'],
+            'v<':           ['k_vle()','( x y -- mask ) mask of x<y item by item'],
+            'v>':           ['k_vgt()','( x y -- mask ) mask of x>y item by item'],
+            'v<=':          ['k_vleeq()','( x y -- mask ) mask of x<=y item by item'],
+            'v>=':          ['k_vgteq()','( x y -- mask ) mask of x>=y item by item'],
+            'v==':          ['k_veq()','( x y -- mask ) mask of x==y item by item'],
+            'v!=':          ['k_vneq()','( x y -- mask ) mask of x!=y item by item'],
+            'vsel':         ['k_vsel()','( vec mask -- vec ) vector of the items of vec where mask is 1'],
+            'vdot':         ['k_vdot()','( vec1 vec2 -- x ) dot product of vec1 & vec2'],
+            'vcumsum':      ['k_vcumsum()','( vec -- vec ) vector of the cumulative sums of vec'],
+# Iterator words
+            '###20':        ['k_pass()','  ===Iterator words==='],
+            'range':        ['k_range()','( start stop step -- iter ) iterator over the integers from start to stop excluded, by step'],
+            'iter':         ['k_iter()','( seq -- iter ) iterator over seq: items of a list, tuple, set, string, (key,value) of a dict, lines of a file'],
+            'next':         ['k_next()','( iter -- iter item | iter ) ZF=1 & next item of iter, ZF=0 & no item if iter is exhausted'],
+            'take':         ['k_take()','( iter n -- iter ) iterator over the n first items of iter'],
+            'zip':          ['k_zip()','( iter1 iter2 -- iter ) iterator over tuples (item1,item2), ends with the shortest'],
+            'chain':        ['k_chain()','( iter1 iter2 -- iter ) iterator over the items of iter1, then of iter2'],
+            'ilist':        ['k_ilist()','( iter -- list ) list of the items left in iter'],
+            'iset':         ['k_iset()','( iter -- set ) set of the items left in iter'],
+            'idict':        ['k_idict()','( iter -- dict ) dictionary of the (key,value) items left in iter']
             
         }
 #
@@ -367,7 +433,14 @@ CompDef =   {
             'if':   ['c_compif()','( -- ) compile if: continue execution if ZF == 1, else branch to "then"'],
             'ifz':  ['c_compifnot()','( -- ) compile ifz: same as if, but for ZF == 0'],
             'ifneq':['c_compifneq()','( x y -- x y ) compile ifneq: continue execution if x!=y, else branch to "then"'],
-            'then': ['c_compthen()','( -- ) compile then: branch there if condition not satisfied']
+            'then': ['c_compthen()','( -- ) compile then: branch there if condition not satisfied'],
+            'inline':['c_compinline()','( -- ) mark definition being compiled to be inlined at call sites'],
+            'do':   ['c_compdo()','( limit start -- ) compile do: counted loop, I from start to limit-1'],
+            'loop': ['c_comploop()','( -- ) compile loop: I += 1, branch back after "do" while I < limit'],
+            'begin':['c_compbegin()','( -- ) compile begin: start of "until" or "while ... repeat" loop'],
+            'until':['c_compuntil()','( -- ) compile until: branch back after "begin" while ZF == 0'],
+            'while':['c_compwhile()','( -- ) compile while: continue if ZF == 1, else leave loop after "repeat"'],
+            'repeat':['c_comprepeat()','( -- ) compile repeat: branch back after "begin"']
             }
 #
 #============================
@@ -386,9 +459,12 @@ CoreDef = {
 #
 #   Execution List : new words are compiled here as pairs of [ Execution Token, Parameter],
 #   where:
-#       - Execution Token (XT): name of the Kernel function (Python coded)
+#       - Execution Token (XT): the Kernel function (Python coded) itself, resolved at compile time;
+#         the entries below are given by name and resolved at start, same as at load
 #       - Parameter: optional, depends of XT (data to be pushed on the stack, call pointer, etc.)
 #   Format: Token Threaded Code (TTC)
+#   Stored at start in a CodeList: XTs as opcodes in an array, parameters in a parallel list;
+#   ExecList[idx] is still seen as [XT,PFA]
 #
 ExecList = [
 #
@@ -429,15 +505,237 @@ PFA = 1
 #============================
 #============================
 #	NEXT - the execution engine - inner(index) interpreter of RPPy
-#	- fetch the Execution Token (XT) & execute it
+#	- fetch the Execution Token (XT) & call it
 #	- post-increment IP to the next word to execute
 #
 def NEXT():
     global IP,CFA           # IP points to the current XT to execute
-    exec(ExecList[IP][CFA])
+    XTList[ExecList.ops[IP]]()  # XT is a function reference, no exec of source text
     IP += 1
 #
 #============================
+#
+#   XT resolving - Execution Tokens are stored in ExecList as function references
+#   - getxt: XT name ( 'k_plus()' as in KernDef, or as found in a saved file ) -> function
+#   - xtname: function -> XT name, used when saving ExecList as JSON
+#
+XTDict = {}     # XT name -> function, filled at first use of every XT name
+XTName = {}     # function -> XT name, reverse of XTDict
+#
+def getxt(name):
+    fn = XTDict.get(name,None)
+    if fn is None :
+        fn = eval(name.removesuffix('()'))  # resolved once per XT name, not at each execution
+        XTDict[name] = fn
+        if name.endswith('()') :
+            XTName[fn] = name
+    return fn
+#
+def xtname(fn):
+    name = XTName.get(fn,None)
+    if name is None :           # XTs compiled directly by the compiler: doCall, doLit, ...
+        name = fn.__name__ + '()'
+        XTName[fn] = name
+    return name
+#
+def exportexeclist():       # copy of ExecList with XT names instead of functions, ready for JSON
+    return [[xtname(GuardXTs.get(XTList[op],XTList[op])),arg] for op,arg in zip(ExecList.ops,ExecList.args)]
+#
+#============================
+#
+#   CodeList - compact store of ExecList
+#   - ops: array of opcodes, the index of each XT in XTList ; 2 bytes per entry
+#   - args: parallel list of PFAs
+#   - heads: side table of definition headers, Def name -> indexes of its Def entries,
+#     used by count/index & pdef/repdef instead of scanning ExecList ; defpos: all Def indexes
+#   - refs: side table of references, index of Def -> indexes of doCall/doJmp/doLitx entries
+#     to it, used by refdef/repdef
+#   side tables follow append & deletion of the last entries, as done at each compile cycle;
+#   rebuilt after any other change to a Def or reference entry
+#   - saved: entries before it unchanged since the last save ( image or journal ), but the
+#     ones in patched, modified in place ; used by the journal to write only the changes
+#   ExecList[idx] gives a CodeEntry, a view of the entry usable as [XT,PFA], also to modify it;
+#   a slice gives a list of [XT,PFA] copies
+#
+XTList = []     # opcode -> XT
+XTCode = {}     # XT -> opcode
+#
+def xtcode(xt):             # opcode of XT, new one at first use
+    op = XTCode.get(xt,None)
+    if op is None :
+        op = len(XTList)
+        XTCode[xt] = op
+        XTList.append(xt)
+    return op
+#
+class CodeEntry:            # view of entry idx of a CodeList, as [XT,PFA]
+    __slots__ = ('code','idx')
+    def __init__(self,code,idx):
+        self.code = code
+        self.idx = idx
+    def __getitem__(self,k):
+        if k == 0 or k == -2 :
+            return XTList[self.code.ops[self.idx]]
+        elif k == 1 or k == -1 :
+            return self.code.args[self.idx]
+        raise IndexError('entry index out of range')
+    def __setitem__(self,k,val):
+        if self.idx < self.code.saved :
+            self.code.patched.add(self.idx)
+        if k == 0 or k == -2 :
+            xt = self[0]
+            self.code.ops[self.idx] = xtcode(val)
+            if xt is Def or val is Def :
+                self.code.heads = None
+            if xt in RefXTs or val in RefXTs :
+                self.code.refs = None
+        elif k == 1 or k == -1 :
+            self.code.args[self.idx] = val
+            xt = self[0]
+            if xt is Def :
+                self.code.heads = None
+            elif xt in RefXTs :
+                self.code.refs = None
+        else:
+            raise IndexError('entry index out of range')
+    def __len__(self):
+        return 2
+    def __iter__(self):
+        yield self[0]
+        yield self[1]
+    def __eq__(self,other):
+        return len(other) == 2 and self[0] == other[0] and self[1] == other[1]
+    __hash__ = None
+    def __repr__(self):
+        return repr([self[0],self[1]])
+#
+class CodeList:             # ExecList as opcodes array + PFAs list + Def headers & references tables
+    def __init__(self,entries=()):
+        self.ops = array('H')
+        self.args = []
+        self.heads = None
+        self.defpos = None
+        self.refs = None
+        self.saved = 0
+        self.patched = set()
+        for entry in entries :
+            self.append(entry)
+    def __len__(self):
+        return len(self.ops)
+    def __getitem__(self,idx):
+        if isinstance(idx,slice) :
+            return [[XTList[op],arg] for op,arg in zip(self.ops[idx],self.args[idx])]
+        if idx < 0 :
+            idx += len(self.ops)
+        if idx < 0 or idx >= len(self.ops) :
+            raise IndexError('ExecList index out of range')
+        return CodeEntry(self,idx)
+    def __setitem__(self,idx,val):
+        if isinstance(idx,slice) :
+            self.saved = min(self.saved,idx.indices(len(self.ops))[0])
+            val = list(val)
+            self.ops[idx] = array('H',[xtcode(entry[0]) for entry in val])
+            self.args[idx] = [entry[1] for entry in val]
+        else:
+            if idx < 0 :
+                idx += len(self.ops)
+            if idx < self.saved :
+                self.patched.add(idx)
+            self.ops[idx] = xtcode(val[0])
+            self.args[idx] = val[1]
+        self.heads = None
+        self.refs = None
+    def __delitem__(self,idx):
+        if isinstance(idx,slice) :
+            start,stop,step = idx.indices(len(self.ops))
+            if step == 1 and stop == len(self.ops) :
+                self.truncate(start)
+                return
+            self.saved = min(self.saved,start)
+        else:
+            self.saved = min(self.saved,idx % len(self.ops))
+        del self.ops[idx]
+        del self.args[idx]
+        self.heads = None
+        self.refs = None
+    def truncate(self,start):   # delete entries from start on, side tables kept
+        opdef = xtcode(Def)
+        for idx in range(len(self.ops)-1,start-1,-1) :  # last first, so last in side tables
+            op = self.ops[idx]
+            if op == opdef and self.heads is not None :
+                self.heads[self.args[idx]].pop()
+                if not self.heads[self.args[idx]] :
+                    del self.heads[self.args[idx]]
+                self.defpos.pop()
+            elif self.refs is not None and XTList[op] in RefXTs :
+                self.refs[self.args[idx]].pop()
+                if not self.refs[self.args[idx]] :
+                    del self.refs[self.args[idx]]
+        del self.ops[start:]
+        del self.args[start:]
+        self.saved = min(self.saved,start)
+    def insert(self,idx,ops,args):  # insert opcodes ops & their PFAs args at idx
+        self.saved = min(self.saved,idx)
+        self.ops[idx:idx] = ops
+        self.args[idx:idx] = args
+        self.heads = None
+        self.refs = None
+    def __iter__(self):
+        for idx in range(len(self.ops)) :
+            yield CodeEntry(self,idx)
+    def append(self,entry):
+        xt = entry[0]
+        if isinstance(xt,str) :         # XT name, as saved
+            xt = getxt(xt)
+        self.ops.append(xtcode(xt))
+        self.args.append(entry[1])
+        if xt is Def :
+            if self.heads is not None :
+                self.heads.setdefault(entry[1],[]).append(len(self.ops)-1)
+                self.defpos.append(len(self.ops)-1)
+        elif xt in RefXTs and self.refs is not None :
+            self.refs.setdefault(entry[1],[]).append(len(self.ops)-1)
+    def extend(self,entries):
+        for entry in entries :
+            self.append(entry)
+    def headers(self):      # Def name -> indexes of its Def entries
+        if self.heads is None :
+            self.heads = {}
+            self.defpos = []
+            opdef = xtcode(Def)
+            for idx,op in enumerate(self.ops) :
+                if op == opdef :
+                    self.heads.setdefault(self.args[idx],[]).append(idx)
+                    self.defpos.append(idx)
+        return self.heads
+    def defat(self,idx):    # index of the Def entry of the definition holding idx, None if none
+        self.headers()
+        i = bisect.bisect_right(self.defpos,idx)
+        return self.defpos[i-1] if i else None
+    def references(self):   # index of Def -> indexes of doCall/doJmp/doLitx entries to it
+        if self.refs is None :
+            self.refs = {}
+            refops = {xtcode(xt) for xt in RefXTs}
+            for idx,op in enumerate(self.ops) :
+                if op in refops :
+                    self.refs.setdefault(self.args[idx],[]).append(idx)
+        return self.refs
+    def count(self,entry):
+        if entry[0] is Def :
+            return len(self.headers().get(entry[1],()))
+        return sum(1 for e in self if e == entry)
+    def index(self,entry,start=0):
+        if entry[0] is Def :
+            for idx in self.headers().get(entry[1],()) :
+                if idx >= start :
+                    return idx
+        else:
+            for idx in range(start,len(self.ops)) :
+                if self[idx] == entry :
+                    return idx
+        raise ValueError(repr(entry) + ' not in ExecList')
+#
+#============================
 #============================
 #
 #   REPL - Read Eval Print Loop - outer(text) interpreter of RPPy
@@ -456,33 +754,61 @@ itib = 0       # index in TIB
 
 IndExec = 0     # 0 = compile ; 1 = execute 
 IfList =[]      # store index of 'if's there, used by 'then' to fill with endif index
+LoopList = []   # open loops: ['do'|'begin'|'while', index], used by 'loop/until/while/repeat'
+                # 'begin' index is the one of the entry before the loop, loops continue after it
 CompErr = 0     # return nb. of compile error, if one
 LastDef = ''    # name of last definition encountered
 IsDef = 0       # 0 no def, 1 def(s) encountered
 Here = 2        # pointer to start execution from last compiled execution string in ExecList
 IdxRetJmp = Here    # index of last compiled return/jump
+DefStart = Here     # index of first def compiled in current compile cycle
+InlineMax = 3       # definitions up to this nb. of entries are inlined at call sites
+InlineSet = set()   # names of definitions marked by "inline", inlined whatever their size
+InlineList = []     # inlined copies: [start index, stop index, index of inlined Def] 
 brk = None      # returned from compiling words, used by compiler; True means break, False means continue compiling
 switchpds = 1   # printing data stack ON
 IndSave = 0     # holds nb. of saved definitions
+Batch = None    # script read in batch mode ( -f or input not a terminal ), None for interactive REPL
+BatchName = ''  # name of the script, for error messages
+BatchLine = 0   # nb. of the last line read from the script
+BatchEnd = 0    # 1 once the end of the script reached, remaining input executed
+#
+#============================
+#
+def readline(prompt):       # next input line, from the user or from the script ; None at end of script
+    global BatchLine
+    if Batch is None :
+        return input(prompt)
+    line = Batch.readline() # one line at a time, the script is never read whole
+    if line == '' :
+        return None
+    BatchLine += 1
+    return line.removesuffix('\n')
+#
+def batchexit(code):        # end of batch mode: 0 = script done, 1 = compile error or abort
+    if code :
+        print('RPPy: error at line',BatchLine,'of',BatchName,file=sys.stderr)
+    exit(code)
 #
 #============================
 #
 def REPL():                 # Read Eval Print Loop - the outer (text) interpreter of RPPY
 
     global IP,ExecList,Here
-    global IndExec, IfList, CompErr, LastDef, IsDef
+    global IndExec, IfList, LoopList, CompErr, LastDef, IsDef
     global tib, itib
     global IdxRetJmp
     global IndSave
     global switchpds
+    global BatchEnd
     
     CtrlQ = 17              # end RPPY execution, press only at newline
     CtrlS = 19              # save user defs to file "tempsave.rpp", continue execution, press only at newline 
 
 #   reset compile/exec cycle data
-    IndExec = 0 ; IfList =[] ; CompErr = 0 ; LastDef = '_anonymous_' ; IsDef = 0
+    IndExec = 0 ; IfList =[] ; LoopList = [] ; CompErr = 0 ; LastDef = '_anonymous_' ; IsDef = 0
     
-    if ExecList[-1][0] == 'REPL()':  # wipe out last entry leaved by REPL's previous cycle
+    if ExecList[-1][0] == REPL:  # wipe out last entry leaved by REPL's previous cycle
         del ExecList[-1:]
     Here = len(ExecList)    # last entry completed, new words compiled from here downwards
 #
@@ -494,9 +820,14 @@ def REPL():                 # Read Eval Print Loop - the outer (text) interprete
 #   start gathering input ; works multiline
         tib = "" ; itib = 0 
         if IsDef == 0 :
-            s_input = input('ex> ') # get user input for execution until empty line or "." arrives
+            s_input = readline('ex> ') # get user input for execution until empty line or "." arrives
         else:
-            s_input = input('co> ') # get user input for compiling defs until "." arrives
+            s_input = readline('co> ') # get user input for compiling defs until "." arrives
+        if s_input is None :    # end of script: end definitions & execute what remains, then exit
+            if BatchEnd or (IsDef == 0 and len(ExecList) == Here) :
+                batchexit(0)
+            BatchEnd = 1
+            s_input = '.'
             
         if len(s_input) == 0 and IsDef == 0 :   # if no input and no def compiling        
             tib = s_input + '. '    # mark "." for first empty line to start executing previous line(s)
@@ -508,31 +839,26 @@ def REPL():                 # Read Eval Print Loop - the outer (text) interprete
             
         if ord(tib[0]) == CtrlS :   # save user defs to file "tempsave.rpp"
             if len(CoreDef) :       # save only if there are already definitions made
-                lsave=[]
-                lastret = ['IdxR',IdxRetJmp]
-                ExecList.append(lastret)
-                lsave.append(ExecList)
-                lsave.append(CoreDef)
                 try:
-                    f=open('tempsave.rpp','w')
-                    json.dump(lsave,f)
-                    f.close()
+                    fname = journalsave('tempsave.rpp')
                     IndSave = len(CoreDef)
-                    print('Saved:',IndSave,'definitions to tempsave.rpp')
-                    del ExecList[-1]
-                    REPL()          # continue execution after save
-                except (OSError) as e:
+                    print('Saved:',IndSave,'definitions to',fname)
+                    raise Restart   # continue execution after save
+                except (ValueError,OSError) as e:
                     abort(str(e))
             else:
                 print('No definitions to save')
-                REPL()
+                raise Restart
                 
             
 #    call compiler
         compile()
    
         if CompErr :            # compile error encountered
+            if Batch is not None :
+                batchexit(1)    # no one to correct it
             CompErr = 0         # restart compile cycle, to correct error
+            LoopList = []       # loops of the rejected input are gone
             continue
 
 # end of compile phase, start execution phase
@@ -540,10 +866,18 @@ def REPL():                 # Read Eval Print Loop - the outer (text) interprete
  
     if len(IfList) > 0 :    # see if unresolved 'if's remainded
         print('Compile error: "if/ifz/ifneq" without closing "then": ' , len(IfList) , ' unresolved')
-        REPL()
+        if Batch is not None :
+            batchexit(1)
+        raise Restart
+    if len(LoopList) > 0 :  # see if unresolved loops remainded
+        print('Compile error: "do/begin/while" without closing "loop/until/repeat": ' , len(LoopList) , ' unresolved')
+        if Batch is not None :
+            batchexit(1)
+        raise Restart
     if len(ExecList) == Here :
-        print('Empty line, nothing to execute')
-        REPL()
+        if Batch is None :      # blank lines of scripts are not reported
+            print('Empty line, nothing to execute')
+        raise Restart
     
     if IsDef == 1 :             # a new def was compiled
         
@@ -551,30 +885,25 @@ def REPL():                 # Read Eval Print Loop - the outer (text) interprete
                                 # because there's no call for it, so the ";" sends you to outer space...
         IsDef = 0               # mark end of def compiling
 
-    lastentry = ['REPL()','REPL']   # append as last XT REPL itself    
+    lastentry = [REPL,'REPL']   # append as last XT REPL itself    
     ExecList.append(lastentry)  # so at execution end it'll restart the loop
     IP = Here - 1               # start execution of last compiled input stream
 #
 #============================
 #
+WordRe = re.compile('[^ \t\n\r\v\f]+')   # a word: chars up to whitespace, \n\r not delivered by input
+#
 def word():                 # tokeniser: extract a word (whitespace delimited string of chars)
     global tib,itib
-
-    whitespaces = ' \t\n\r\v\f' # the \n\r are not delivered and the \v,\f are superfluous...
-
-    while itib < (len(tib) - 1):
-        chr = tib[itib]
-        itib += 1
-        if (chr not in whitespaces):
-            break
-    w = chr
-    while itib < (len(tib) - 1):
-        chr = tib[itib]
-        itib += 1
-        if (chr in whitespaces):
-            break
-        w = w + chr
-    return w
+                            # the blank added by REPL at end of tib is never part of a word
+    m = WordRe.search(tib,itib,len(tib)-1)
+    if m is None :          # only whitespace left: its last char is the word, blank/tab line
+        itib = len(tib) - 1
+        return tib[-2]
+    itib = m.end()
+    if itib < len(tib) - 1 :
+        itib += 1           # skip the whitespace ending the word
+    return m.group()
 #
 #============================
 #
@@ -582,7 +911,7 @@ def compile():             # parse tib & compile XTs to ExecList
 
     global KernDef,CoreDef,ExecList,tib,itib,CompErr
     global LastDef,IndExec,IfList,IsDef,Here
-    global IdxRetJmp
+    global IdxRetJmp,DefStart,InlineList
     global brk
     
     while itib < len(tib) - 1 :
@@ -590,21 +919,26 @@ def compile():             # parse tib & compile XTs to ExecList
         
         tkname = CompDef.get(w,None)    # first, search compiling words , to execute them immediate
         if tkname :
-            exec(tkname[0])
+            getxt(tkname[0])()          # function resolved once, no exec of source text
             if brk :
                 break
             continue
 
-        tkname = CoreDef.get(w,None)    # second, search high level word in Core Dict
-        if tkname :
+        tkname = CoreDef.get(w,None) or libload(w)  # second, search high level word in Core Dict,
+        if tkname :                                 # then in libraries
             ExecListIdx = tkname[0]     # get corresponding index in ExecList where the word starts
-            newentry = ['doCall()',ExecListIdx]    # create a call to respective word
+            body = inlinebody(ExecListIdx)
+            if body :                   # copy body in place of call, recorded for refdef/repdef/pdef
+                InlineList.append([len(ExecList),len(ExecList)+len(body),ExecListIdx])
+                ExecList.extend([list(entry) for entry in body])
+                continue
+            newentry = [doCall,ExecListIdx]    # create a call to respective word
             ExecList.append(newentry)
             continue
         
         tkname = KernDef.get(w,None)     # third, search word in Kernel Dict as a primitive
         if tkname :
-            pycode = tkname[0]           # get XT (name of python function)
+            pycode = getxt(tkname[0])    # get XT (python function resolved from its name)
             newentry = [pycode,w]        # create an execute to the python function
             ExecList.append(newentry)
             continue
@@ -616,16 +950,20 @@ def compile():             # parse tib & compile XTs to ExecList
 #       - a single quoted string without blanks - 'str
 #
         if w.endswith(':') and len(w) > 1 :    # new def to create
-            if tib.find(w) == 0 :             # found word at start of TIB
+            if tib.startswith(w) :            # found word at start of TIB
             
                 if IdxRetJmp != 1 :            # now wipe out all non-definition part already compiled
                     del ExecList[IdxRetJmp:]   # delete all previous entries, until last ret/jmp compiled
                                                # this way only definitions remain in the exec list
+                    inlineprune(IdxRetJmp)
+                if IsDef == 0 :
+                    DefStart = len(ExecList)    # first def of this compile cycle, optimised from here
                 IsDef =  1                     # mark presence of def 
                 LastDef = w.removesuffix(':')
+                InlineSet.discard(LastDef)      # "inline" marks this definition only, if given again
                 newentry = {LastDef : [len(ExecList),'']}   # {name : starting point for execution}
                 CoreDef.update(newentry)                    # add/modify new def to dict
-                ExecList.append(['Def()',LastDef])  # store a NOP at starting point , used at decompiling
+                ExecList.append([Def,LastDef])  # store a NOP at starting point , used at decompiling
                 continue
             else:
                 CompErr = 1                     # def must start at begin of input
@@ -633,10 +971,10 @@ def compile():             # parse tib & compile XTs to ExecList
                 break
                                 
         if w.startswith("*") and len(w) > 1 :        #  get index in ExecList for the "'name"
-            tkname = CoreDef.get(w.removeprefix("*"),None)  # search "name" in high level defs
+            tkname = CoreDef.get(w.removeprefix("*"),None) or libload(w.removeprefix("*"))  # search "name" in high level defs
             if tkname :
                 ExecListIdx = tkname[0]     # get corresponding index in ExecList where de word starts
-                newentry = ['doLitx()',ExecListIdx]    # push index to stack at execution
+                newentry = [doLitx,ExecListIdx]    # push index to stack at execution
                 ExecList.append(newentry)
                 continue
             else:
@@ -645,14 +983,14 @@ def compile():             # parse tib & compile XTs to ExecList
                 break
                 
         if  w.startswith("'") and len(w) > 1 :      # literal string without blanks
-            newentry = ['doLit()',w.removeprefix("'")]
+            newentry = [doLit,w.removeprefix("'")]
             ExecList.append(newentry)
             continue
 #
 #   none of the above; see if integer  number 
 #                
         if w.isdigit() :        # see if number string
-            newentry = ['doLit()',int(w)]
+            newentry = [doLit,int(w)]
             ExecList.append(newentry)   # integer literal
             continue
 #
@@ -660,10 +998,10 @@ def compile():             # parse tib & compile XTs to ExecList
 #   if invalid result, reject input as undefined word
 #        
         try:
-            number = eval(w)    # actually it's an expression to evaluate ( in INFIX !)
+            number = literal(w) # literal or expression of literals to evaluate ( in INFIX !)
                                 # can be a float, complex,  hex nb. or any expression with numbers
                                 # even list, dict, etc. are permitted, but without any blank inside!!
-            newentry = ['doLit()',number]
+            newentry = [doLit,number]
             ExecList.append(newentry)
             continue
         except ZeroDivisionError as e:
@@ -677,6 +1015,93 @@ def compile():             # parse tib & compile XTs to ExecList
             break
 #
 #============================
+#
+#   Literal parsing - tokens not found in dictionaries, at compile time
+#   - fast paths for hex, float & complex numbers, negative integers
+#   - else parsed by ast: literals ( list, dict, tuple, set, string ... ) by ast.literal_eval,
+#     infix expressions of literals ( "(10+20)*3/2" ) by littree; names, calls, attributes ...
+#     are rejected, no code of the input is executed
+#   - values cached by token text; mutable ones copied, every literal compiled is a new object
+#
+#============================
+#
+HexRe = re.compile('[-+]?0[xX][0-9a-fA-F]+')
+FloatRe = re.compile(r'[-+]?(\d+\.\d*|\.\d+|\d+(?=[eE]))([eE][-+]?\d+)?')
+ImagRe = re.compile(r'(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?[jJ]')
+IntRe = re.compile('[-+]?(0|[1-9][0-9]*)')
+#
+LitOpsAst = {               # ast operator -> python function
+            ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+            ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+            ast.Pow: operator.pow, ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+            ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+            ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert,
+            ast.Not: operator.not_,
+            ast.Lt: operator.lt, ast.Gt: operator.gt, ast.LtE: operator.le, ast.GtE: operator.ge,
+            ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.In: lambda x,y: x in y,
+            ast.NotIn: lambda x,y: x not in y
+            }
+LitNames = {'int': int, 'float': float, 'complex': complex, 'str': str, 'bool': bool,
+            'list': list, 'tuple': tuple, 'dict': dict, 'set': set, 'frozenset': frozenset,
+            'bytes': bytes, 'type': type}   # types, as "x type int ==" compares them
+#
+def littree(node):          # value of an expression tree of literals
+    if isinstance(node,ast.Constant) :
+        return node.value
+    elif isinstance(node,ast.BinOp) and type(node.op) in LitOpsAst :
+        return LitOpsAst[type(node.op)](littree(node.left),littree(node.right))
+    elif isinstance(node,ast.UnaryOp) :
+        return LitOpsAst[type(node.op)](littree(node.operand))
+    elif isinstance(node,ast.Compare) and all([type(op) in LitOpsAst for op in node.ops]) :
+        left = littree(node.left)
+        for op,right in zip(node.ops,node.comparators) :
+            right = littree(right)
+            if not LitOpsAst[type(op)](left,right) :
+                return False
+            left = right
+        return True
+    elif isinstance(node,ast.BoolOp) :
+        for value in node.values :
+            val = littree(value)
+            if isinstance(node.op,ast.And) != bool(val) :
+                return val          # "and" stops at first false value, "or" at first true
+        return val
+    elif isinstance(node,(ast.List,ast.Tuple,ast.Set)) :
+        items = [littree(item) for item in node.elts]
+        if isinstance(node,ast.List) :
+            return items
+        return tuple(items) if isinstance(node,ast.Tuple) else set(items)
+    elif isinstance(node,ast.Dict) and None not in node.keys :
+        return {littree(k): littree(v) for k,v in zip(node.keys,node.values)}
+    elif isinstance(node,ast.Name) :
+        if node.id in LitNames :
+            return LitNames[node.id]
+        raise NameError("name '"+node.id+"' is not defined")
+    raise ValueError('only literals and operators allowed')
+#
+@functools.lru_cache(maxsize=4096)
+def litparse(w):            # value of literal token w ; SyntaxError, NameError ... if not a literal
+    if HexRe.fullmatch(w) :
+        return int(w,16)
+    if FloatRe.fullmatch(w) :
+        return float(w)
+    if ImagRe.fullmatch(w) :
+        return complex(w)
+    if IntRe.fullmatch(w) :
+        return int(w)
+    tree = ast.parse(w,'<string>','eval')   # same syntax errors as eval
+    try:
+        return ast.literal_eval(tree)
+    except ValueError :                     # not a plain literal, maybe an expression
+        return littree(tree.body)
+#
+def literal(w):             # new object for literal token w
+    val = litparse(w)
+    if isinstance(val,(int,float,complex,str,bool,type(None),type)) :
+        return val
+    return copy.deepcopy(val)   # cached list, dict ... not shared by two literals
+#
+#============================
 #   Compiler words definitions
 #============================ 
 #                         
@@ -697,20 +1122,21 @@ def c_compdot():             # "." encountered, mark end of edit/compile phase,
     global brk
     
     if IsDef == 1 :         # if end of def compile, compile a ret/call to always properly finish the def
-        if ExecList[-1][CFA] == 'doRet()' or ExecList[-1][CFA] == 'doJmp()' :  # if already a ret/jmp present, do nothing
-            IndExec = 1
-            brk = True
-            return
+        if ExecList[-1][CFA] == doRet or ExecList[-1][CFA] == doJmp :  # if already a ret/jmp present, do nothing
+            pass
         else:  
-            if ExecList[-1][CFA] == 'doCall()' : # tail call optimisation if last XT is a call
-                ExecList[-1][CFA] = 'doJmp()'    # replace call before ret with jump to word
+            if ExecList[-1][CFA] == doCall : # tail call optimisation if last XT is a call
+                ExecList[-1][CFA] = doJmp    # replace call before ret with jump to word
                             # that way recursive calls don't fill the return stack
                             # do not compile return
             else:
-                newentry = ['doRet()',';']   # compile return unconditionally
+                newentry = [doRet,';']   # compile return unconditionally
                 ExecList.append(newentry)
             IdxRetJmp = len(ExecList)        # mark index of last compiled ret/jmp, to be used by next def
                                          # as starting point to compile it
+        if len(IfList) == 0 :               # all "then" resolved, optimise the defs just compiled
+            peephole(DefStart)
+            stackverify(DefStart)
     IndExec = 1             # signal to REPL to start execution of compiled tokens
     brk = True              # exit compiler loop
 #============================       
@@ -745,27 +1171,34 @@ def c_compmlstr():          # """ encountered, create multiline string
     s = substring('"""')
     if s != '' :
         slstr = '"""'+s+'"""'   # end found on single input line, same as string start
-        sls = eval(slstr)
-        newentry = ['doLit()',sls]   
+        sls = ast.literal_eval(slstr)
+        newentry = [doLit,sls]   
         ExecList.append(newentry)
         brk = False
         return
     else:
         mlstr = '"""'+tib[itib:]+'\n' # get rest of current line after """ 
-        s_input = input('""> ')+'\n'  # add a newline at end of every readed line
+        s_input = mlline()      # add a newline at end of every readed line
         while s_input.find('"""') == -1 :   # read input until closing """ found
             mlstr = mlstr + s_input
-            s_input = input('""> ')+'\n'
+            s_input = mlline()
         mls = mlstr+s_input[0:s_input.find('"""')+3]    # get remnant of mlstr
         if len(s_input) > s_input.find('"""')+3 :       # verify if text after """ present
             print('Compile warning: all data after closing triple-quote in current line is ignored!')
-        sls = eval(mls)                 # beware that all input after closing """ is ignored!
-        newentry = ['doLit()',sls]      # that means in definitions you can loose the closing ";" !!   
+        sls = ast.literal_eval(mls)     # beware that all input after closing """ is ignored!
+        newentry = [doLit,sls]      # that means in definitions you can loose the closing ";" !!   
         ExecList.append(newentry)
         brk = True
         return
 
 #============================   
+def mlline():               # next line of a multiline string
+    s_input = readline('""> ')
+    if s_input is None :    # end of script
+        print('Compile error: """ without closing marker """')
+        batchexit(1)
+    return s_input + '\n'
+#============================   
 def c_compstr():             # '"' encountered, create string with embedded whitespaces only : "  ...  ...  ... " as literal
     global CompErr,ExecList
     global brk
@@ -775,7 +1208,7 @@ def c_compstr():             # '"' encountered, create string with embedded whit
         print('Compile error: " without closing marker "')
         brk = True
         return
-    newentry = ['doLit()',s]   # append execution of respective string literal
+    newentry = [doLit,s]   # append execution of respective string literal
     ExecList.append(newentry)
     brk = False
     return
@@ -790,7 +1223,7 @@ def c_compstrall():          # "->" encountered, create string with all sorts of
         print('Compile error: -> without closing marker <-')
         brk = True
         return
-    newentry = ['doLit()',s]   # append execution of respective string literal
+    newentry = [doLit,s]   # append execution of respective string literal
     ExecList.append(newentry)
     brk = False
     return
@@ -803,14 +1236,19 @@ def c_compret():             # ";" encountered, compile return
         print('Compile error: return without definition starting')
         brk = True
         return
+    elif ['do'] in [lp[:1] for lp in LoopList] :
+        CompErr = 10        # ';' would leave the loop frame of "do" on LoopStack
+        print('Compile error: return inside "do ... loop"')
+        brk = True
+        return
     else:
-        if ExecList[-1][CFA] == 'doCall()' : # tail call optimisation if last XT is a call
-            ExecList[-1][CFA] = 'doJmp()'    # replace call before ret with jump to word
+        if ExecList[-1][CFA] == doCall : # tail call optimisation if last XT is a call
+            ExecList[-1][CFA] = doJmp    # replace call before ret with jump to word
             IdxRetJmp = len(ExecList)        # mark index of last compiled ret/jmp
             brk = False                      # that way recursive calls don't fill the return stack
             return                           # do not compile return
         else:
-            newentry = ['doRet()',';']       # compile return unconditionally
+            newentry = [doRet,';']       # compile return unconditionally
             ExecList.append(newentry)
             IdxRetJmp = len(ExecList)       # mark index of last compiled ret/jmp, to be used by next def
             brk = False                     # as starting point to compile it
@@ -821,7 +1259,7 @@ def c_compif():          # "if" encountered, compile void jump to next "then"
     global brk
                                             # create void PFA entry to be filled afterwards by 'then'
     IfList.append(len(ExecList))            # store current index, where 'if' is stored
-    newentry = ['doIf()',0]                # PFA = 0 here, replace afterwards with index of following 'then'
+    newentry = [doIf,0]                # PFA = 0 here, replace afterwards with index of following 'then'
     ExecList.append(newentry)
     brk = False
     return
@@ -831,7 +1269,7 @@ def c_compifnot():          # "ifnot" encountered, compile void jump to next "th
     global brk
                                             # create void PFA entry to be filled afterwards by 'then'
     IfList.append(len(ExecList))            # store current index, where 'if' is stored
-    newentry = ['doIfnot()',0]             # PFA = 0 here, replace afterwards with index of following 'then'
+    newentry = [doIfnot,0]             # PFA = 0 here, replace afterwards with index of following 'then'
     ExecList.append(newentry)
     brk = False
     return
@@ -841,7 +1279,7 @@ def c_compifneq():          # "ifneq" encountered, compile void jump to next "th
     global brk
                                             # create void PFA entry to be filled afterwards by 'then'
     IfList.append(len(ExecList))            # store current index, where 'if' is stored
-    newentry = ['doIfneq()',0]             # PFA = 0 here, replace afterwards with index of following 'then'
+    newentry = [doIfneq,0]             # PFA = 0 here, replace afterwards with index of following 'then'
     ExecList.append(newentry)
     brk = False
     return
@@ -854,7 +1292,7 @@ def c_compthen():            # "then" encountered
         idxthen = len(ExecList)
         idxif = IfList.pop()        # get saved 'if' index
         ExecList[idxif][PFA] = idxthen  # store 'then' index to PFA of 'if'
-        newentry = ['k_pass','then']      # nothin' to do here
+        newentry = [k_pass,'then']      # nothin' to do here
         ExecList.append(newentry)
         brk = False
         return
@@ -863,6 +1301,94 @@ def c_compthen():            # "then" encountered
         print('Compile error: no matching "if/ifz/ifneq" for "then"')
         brk = True
         return
+#============================
+def c_compdo():              # "do" encountered, compile start of counted loop
+    global brk
+    LoopList.append(['do',len(ExecList)])
+    newentry = [doDo,0]                # PFA = 0 here, replace afterwards with index of "loop"
+    ExecList.append(newentry)
+    brk = False
+    return
+#============================
+def c_comploop():            # "loop" encountered, compile branch back after "do"
+    global CompErr
+    global brk
+    if len(LoopList) and LoopList[-1][0] == 'do' :
+        idxdo = LoopList.pop()[1]
+        ExecList[idxdo][PFA] = len(ExecList)    # "do" skips the loop up to here
+        newentry = [doLoop,idxdo]
+        ExecList.append(newentry)
+        brk = False
+        return
+    else:
+        CompErr = 11
+        print('Compile error: no matching "do" for "loop"')
+        brk = True
+        return
+#============================
+def c_compbegin():           # "begin" encountered, mark start of loop
+    global brk
+    LoopList.append(['begin',len(ExecList)-1])     # no entry, loops branch back after the last one
+    brk = False
+    return
+#============================
+def c_compuntil():           # "until" encountered, compile conditional branch back after "begin"
+    global CompErr
+    global brk
+    if len(LoopList) and LoopList[-1][0] == 'begin' :
+        newentry = [doUntil,LoopList.pop()[1]]
+        ExecList.append(newentry)
+        brk = False
+        return
+    else:
+        CompErr = 12
+        print('Compile error: no matching "begin" for "until"')
+        brk = True
+        return
+#============================
+def c_compwhile():           # "while" encountered, compile void branch out of loop
+    global CompErr
+    global brk
+    if len(LoopList) and LoopList[-1][0] == 'begin' :
+        LoopList.append(['while',len(ExecList)])
+        newentry = [doWhile,0]         # PFA = 0 here, replace afterwards with index of "repeat"
+        ExecList.append(newentry)
+        brk = False
+        return
+    else:
+        CompErr = 12
+        print('Compile error: no matching "begin" for "while"')
+        brk = True
+        return
+#============================
+def c_comprepeat():          # "repeat" encountered, compile branch back after "begin"
+    global CompErr
+    global brk
+    if len(LoopList) and LoopList[-1][0] == 'while' :
+        idxwhile = LoopList.pop()[1]
+        idxbegin = LoopList.pop()[1]
+        ExecList[idxwhile][PFA] = len(ExecList)     # "while" leaves the loop after here
+        newentry = [doRepeat,idxbegin]
+        ExecList.append(newentry)
+        brk = False
+        return
+    else:
+        CompErr = 13
+        print('Compile error: no matching "begin ... while" for "repeat"')
+        brk = True
+        return
+#============================
+def c_compinline():          # "inline" encountered, mark current definition to be inlined
+    global CompErr
+    global brk
+    if IsDef == 0 :
+        CompErr = 9                 # 'inline' outside of a definition
+        print('Compile error: "inline" without definition starting')
+        brk = True
+        return
+    InlineSet.add(LastDef)
+    brk = False
+    return
 #
 #============================
 #                          
@@ -879,21 +1405,449 @@ def substring(delim):       # extract a substring with given end delimiter
 #
 #============================
 #
+#   Peephole optimiser - run by "." on the definitions compiled in the current cycle
+#   - constant folding: "lit lit op" & "lit op" computed at compile time, for numbers only,
+#     except from the first entry of a definition, the literal assignment words modify
+#   - "dup drop" & "swap swap" removed
+#   - "then" entries (no op) removed, "if/ifz/ifneq" retargeted
+#   - "lit +" , "lit ==" ... fused in superinstructions, "call ;" replaced by jump
+#   - a sequence is never changed if execution can branch into its middle
+#   "if/ifz/ifneq" hold in PFA the index of the entry preceding the one where execution
+#   continues if condition not satisfied: the "then" entry itself, or the last entry of
+#   the conditional part once "then" removed
+#
+#============================
+#
+FoldOps2 = {                # XTs of binary ops folded at compile time
+            'k_plus': operator.add, 'k_minus': operator.sub, 'k_star': operator.mul,
+            'k_slash': operator.truediv, 'k_dblslash': operator.floordiv, 'k_rem': operator.mod,
+            'k_dblstar': operator.pow, 'k_bitand': operator.and_, 'k_bitor': operator.or_,
+            'k_bitxor': operator.xor, 'k_lshift': operator.lshift, 'k_rshift': operator.rshift
+            }
+FoldOps1 = {                # XTs of unary ops folded at compile time
+            'k_plusone': lambda n: n+1, 'k_minusone': lambda n: n-1,
+            'k_negate': operator.neg, 'k_abs': abs
+            }
+#
+def peephole_fold(xt,args):     # value of xt applied to literals args, or None if not foldable
+    for x in args :
+        if type(x) not in (int,float) :     # bool, str, lists... left to execution
+            return None
+    if len(args) == 2 :
+        op = FoldOps2.get(xt.__name__,None)
+        if op is None :
+            return None
+        if xt.__name__ in ('k_dblstar','k_lshift') and abs(args[1]) > 64 :
+            return None                     # don't build huge numbers at compile time
+        if xt.__name__ in ('k_bitand','k_bitor','k_bitxor','k_lshift','k_rshift') and \
+            not (type(args[0]) is int and type(args[1]) is int) :
+            return None
+    else:
+        op = FoldOps1.get(xt.__name__,None)
+        if op is None :
+            return None
+    try:
+        val = op(*args)
+    except (ZeroDivisionError,OverflowError,ValueError,TypeError) :
+        return None                         # error left to execution, as abort
+    if type(val) not in (int,float) :       # as (-8)**0.5 -> complex
+        return None
+    return val
+#
+def peephole(start):        # optimise ExecList[start:IdxRetJmp]
+    global IdxRetJmp
+    stop = IdxRetJmp
+    code = ExecList[start:stop]
+    n = len(code)
+    alive = [True]*n
+    dests = set()           # entries where execution continues after "if/ifz/ifneq"
+    for i in range(n) :
+        if code[i][CFA] in BranchXTs :
+            dests.add(code[i][PFA]+1-start)
+        elif code[i][CFA] is k_pass and code[i][PFA] == 'then' :
+            alive[i] = False
+    for rec in InlineList :
+        if rec[0] >= start :        # inlined copies are not merged with surrounding code
+            dests.add(rec[0]-start)
+            dests.add(rec[1]-start)
+    
+    changed = True
+    while changed :
+        changed = False
+        live = [i for i in range(n) if alive[i]]
+        isdest = set()      # live entries where execution can branch to
+        for d in dests :
+            for i in live :
+                if i >= d :
+                    isdest.add(i)
+                    break
+        for p in range(len(live)) :
+            i = live[p]
+            j = live[p+1] if p+1 < len(live) else None
+            k = live[p+2] if p+2 < len(live) else None
+            if j is None or j in isdest or code[i][CFA] is Def :
+                continue
+            xti, xtj = code[i][CFA], code[j][CFA]
+            if (xti is k_dup and xtj is k_drop) or (xti is k_swap and xtj is k_swap) :
+                alive[i] = alive[j] = False
+                changed = True
+                break
+            if xti is doCall and xtj is doRet :     # "call ;" left by other optimisations
+                code[i] = [doJmp,code[i][PFA]]
+                alive[j] = False
+                changed = True
+                break
+            if xti is not doLit or (i > 0 and code[i-1][CFA] is Def) :
+                continue                        # literal after Def: assigned by "=", "+=" ...
+            val = peephole_fold(xtj,[code[i][PFA]])
+            if val is not None :                # "lit op"
+                code[i] = [doLit,val]
+                alive[j] = False
+                changed = True
+                break
+            if xtj is doLit and k is not None and k not in isdest :
+                val = peephole_fold(code[k][CFA],[code[i][PFA],code[j][PFA]])
+                if val is not None :            # "lit lit op"
+                    code[i] = [doLit,val]
+                    alive[j] = alive[k] = False
+                    changed = True
+                    break
+            w = code[j][PFA]
+            if isinstance(w,str) and w in LitOps and xtj is getxt(LitOps[w][1]) :
+                code[i] = [doLitOp,[code[i][PFA],w]]  # "lit op" fused in a superinstruction
+                alive[j] = False
+                changed = True
+                break
+    if all(alive) :
+        ExecList[start:stop] = code             # folded literals only, if any
+        return
+    relocate(start,code,alive)
+#
+def relocate(start,code,alive):     # replace ExecList[start:stop] by the alive entries of code
+                                    # indexes moved accordingly ; return index relocation function
+    global IdxRetJmp
+    n = len(code)
+    stop = start + n
+    newpos = []             # new index of every entry in code, or of next alive entry if removed
+    nb = start
+    for i in range(n) :
+        newpos.append(nb)
+        if alive[i] :
+            nb += 1
+    newpos.append(nb)       # stop
+    removed = stop - nb
+    def reloc(idx):         # new index for an index of ExecList
+        if idx < start :
+            return idx
+        elif idx <= stop :
+            return newpos[idx-start]
+        return idx - removed
+    
+    newcode = [code[i] for i in range(n) if alive[i]]
+    ExecList[start:stop] = newcode
+    for idx in range(start,len(ExecList)) :    # entries viewed in place, a slice would copy them
+        entry = ExecList[idx]
+        xt = entry[CFA]
+        if xt in BranchXTs :
+            entry[PFA] = reloc(entry[PFA]+1) - 1    # continue at same entry as before
+        elif xt is doCall or xt is doJmp or xt is doLitx :
+            entry[PFA] = reloc(entry[PFA])
+    for name in CoreDef :
+        if CoreDef[name][0] >= start :
+            CoreDef[name][0] = reloc(CoreDef[name][0])
+    for rec in InlineList :
+        rec[:] = [reloc(idx) for idx in rec]
+    IdxRetJmp = reloc(IdxRetJmp)
+    return reloc
+#
+def insertcode(pos,ops,args):   # insert opcodes ops & PFAs args in ExecList at pos, indexes from pos on
+                                # moved ( compile cycle & IP too ) ; references inside ops & args already set
+    global IP,IdxRetJmp,DefStart,Here
+    n = len(ops)
+    def reloc(idx):         # new index for an index of ExecList
+        return idx + n if idx >= pos else idx
+    
+    ExecList.insert(pos,ops,args)
+    for idx in range(pos+n,len(ExecList)) :    # entries viewed in place, a slice would copy them
+        entry = ExecList[idx]
+        xt = entry[CFA]
+        if xt in BranchXTs :
+            entry[PFA] = reloc(entry[PFA]+1) - 1    # continue at same entry as before
+        elif xt is doCall or xt is doJmp or xt is doLitx :
+            entry[PFA] = reloc(entry[PFA])
+    for name in CoreDef :
+        if CoreDef[name][0] >= pos :
+            CoreDef[name][0] = reloc(CoreDef[name][0])
+    for rec in InlineList :
+        rec[:] = [reloc(idx) for idx in rec]
+    for idx in sorted([k for k in StackEffects if k >= pos],reverse=True) :
+        StackEffects[idx+n] = StackEffects.pop(idx)
+    IfList[:] = [reloc(idx) for idx in IfList]
+    for lp in LoopList :        # "begin" holds the entry before the loop, as branches do
+        lp[1] = reloc(lp[1]+1) - 1 if lp[0] == 'begin' else reloc(lp[1])
+    IP = reloc(IP)
+    rstack[:] = [reloc(idx) for idx in rstack]
+    IdxRetJmp = reloc(IdxRetJmp)
+    DefStart = reloc(DefStart)
+    Here = reloc(Here)
+    closreset()                     # closures compiled at old indexes
+#
+#============================
+#
+#   Inlining - a call to a short definition without branches is replaced by a copy of its body,
+#   saving the call/return; the copies are recorded in InlineList so that refdef, repdef and
+#   pdef still see the inlined word
+#   - automatic up to InlineMax entries ("inlinemax" word), any size if marked by "inline"
+#   - only definitions compiled in a previous cycle, so already optimised
+#   - definitions starting with a literal never inlined: "=", "+=" ... write it, as for variables
+#
+#============================
+#
+def inlinebody(idx):        # entries to copy in place of a call to def at idx, None if call to compile
+    if IsDef == 0 or idx >= DefStart or ExecList[idx][CFA] is not Def :
+        return None         # execution string, or def of current cycle, maybe not finished
+    end = idx + 1
+    while ExecList[end][CFA] is not doRet :
+        xt = ExecList[end][CFA]
+        if xt in (doIf,doIfnot,doIfneq,doJmp,Def,REPL) or xt.__name__ in ClosExcl :
+            return None     # branches & words changing IP
+        end += 1
+    size = end - idx - 1
+    if size == 0 or ExecList[idx+1][CFA] in (doLit,doLitx) :
+        return None         # first literal written by assignment words, copies would keep the old one
+    if size <= InlineMax or ExecList[idx][PFA] in InlineSet :
+        return ExecList[idx+1:end]
+    return None
+#
+def inlineprune(idx):       # forget inlined copies from idx on, deleted from ExecList
+    global InlineList
+    InlineList = [rec for rec in InlineList if rec[0] < idx]
+#
+#============================
+#
+#   Stack effect verification - run by "." after the peephole optimiser, and at load
+#   - the effect of each kernel word is read from its KernDef signature "( x y -- z )";
+#     words with a variable effect ( "...", "|" ) or changing IP make a definition unverifiable
+#   - the depth relative to entry is followed along every path of a definition: both ways
+#     of "if", loops & tail jumps to itself must meet with the same depth, all returns too
+#   - a verified definition gets its stack & math words replaced by unchecked variants
+#     (FastXTs), which don't test the depth nor the types of items
+#   - the only depth not proven is the one at entry: if too low, or an item has a wrong type,
+#     the unchecked word raises a python error before modifying the stack; driver then runs
+#     the checked word again, which aborts with its usual message
+#   - saved files, closures & transpiled modules always get the checked words
+#
+#============================
+#
+StackEffects = {}   # index of Def -> (items needed, net change), None if not verifiable
+KernEffects = {}    # kernel XT -> (items needed, net change), None if not verifiable
+#
+def kerneffect(xt):         # (items needed, net change) of a kernel XT, from its signature
+    if not KernEffects :
+        for val in KernDef.values() :
+            fn = getxt(val[0])
+            sig = val[1].strip()
+            eff = None
+            if sig.startswith('(') and ')' in sig and fn.__name__ not in ClosExcl :
+                sig = sig[1:sig.find(')')]
+                if sig.count('--') == 1 and '...' not in sig and '|' not in sig :
+                    ins,outs = sig.split('--')
+                    eff = (len(ins.split()),len(outs.split())-len(ins.split()))
+            if fn in KernEffects and KernEffects[fn] != eff :
+                eff = None          # same XT for several words with different effects
+            KernEffects[fn] = eff
+    return KernEffects.get(GuardXTs.get(xt,xt),None)
+#
+def stackscan(idx):         # (items needed, net change, indexes of body) of def at idx, or None
+    StackEffects[idx] = None        # recursive calls not verifiable
+    depth = {}                      # index -> depth before executing it, relative to entry
+    need = 0
+    ends = set()                    # depths at return
+    todo = [(idx+1,0)]
+    while todo :
+        i,d = todo.pop()
+        if i in depth :
+            if depth[i] != d :      # paths meeting with different depths
+                return None
+            continue
+        if i >= len(ExecList.ops) :
+            return None
+        depth[i] = d
+        xt = XTList[ExecList.ops[i]]    # read in place, no CodeEntry views
+        pfa = ExecList.args[i]
+        nexts = [i+1]
+        if xt is doLit or xt is doLitx :
+            eff = (0,1)
+        elif xt is doLitOp :        # literal pushed, then word
+            eff = kerneffect(getxt(LitOps[pfa[1]][1]))
+            if eff is not None :
+                eff = (max(eff[0]-1,0),eff[1]+1)
+        elif xt is k_pass :
+            eff = (0,0)
+        elif xt in BranchXTs :
+            eff = (2,-2) if xt is doDo else (2,0) if xt is doIfneq else (0,0)
+            nexts = [pfa+1] if xt is doRepeat else [i+1,pfa+1]
+        elif xt is doCall :
+            eff = stackeffect(pfa)
+        elif xt is doJmp and pfa == idx :   # tail jump to itself: loop back to entry
+            eff = (0,0)
+            nexts = [idx+1]
+        elif xt is doJmp or xt is doRet :
+            eff = stackeffect(pfa) if xt is doJmp else (0,0)
+            nexts = []
+        elif xt is Def or xt is REPL :
+            return None
+        else:
+            eff = kerneffect(xt)
+        if eff is None :
+            return None
+        need = max(need,eff[0]-d)
+        d += eff[1]
+        if not nexts :
+            ends.add(d)
+        for j in nexts :
+            todo.append((j,d))
+    if len(ends) != 1 :             # no return, or returns with different depths
+        return None
+    StackEffects[idx] = (need,ends.pop())
+    return StackEffects[idx] + (depth.keys(),)
+#
+def stackeffect(idx):       # (items needed, net change) of def at idx, None if not verifiable
+    if idx in StackEffects :
+        return StackEffects[idx]
+    stackscan(idx)
+    return StackEffects[idx]
+#
+def stackverify(start):     # verify defs of ExecList[start:], switch verified ones to unchecked XTs
+    for idx in [k for k in StackEffects if k >= start] :
+        del StackEffects[idx]       # indexes reused after deletions
+    opdef = xtcode(Def)
+    for idx in range(start,len(ExecList.ops)) :
+        if ExecList.ops[idx] == opdef :
+            stackfast(idx)
+#
+def stackfast(idx):         # verify def at idx, switch it to unchecked XTs if verified
+    scan = stackscan(idx)
+    if scan :
+        for i in scan[2] :
+            fast = FastXTs.get(XTList[ExecList.ops[i]],None)
+            if fast :
+                ExecList.ops[i] = xtcode(fast)  # neither Def nor reference, side tables kept
+#
+def fasttable():            # opcode -> opcode of unchecked variant if one, else itself
+    pairs = [(xtcode(xt),xtcode(fast)) for xt,fast in FastXTs.items()]
+    table = array('H',range(len(XTList)))
+    for op,opfast in pairs :
+        table[op] = opfast
+    return table
+#
+def stackrestore(effects):  # install effects verified before, as saved in an image ; no new scan
+    StackEffects.clear()
+    StackEffects.update(effects)
+    table = fasttable()
+    ExecList.headers()
+    defpos = ExecList.defpos
+    ends = dict(zip(defpos,defpos[1:]+[IdxRetJmp]))     # index of Def -> end of definition
+    for idx,eff in effects.items() :
+        if eff is not None and idx in ends :
+            ExecList.ops[idx+1:ends[idx]] = array('H',map(table.__getitem__,ExecList.ops[idx+1:ends[idx]]))
+#
+def unchecked(e):           # checked XT of the unchecked one at IP which raised e, or None
+    xt = XTList[ExecList.ops[IP]]
+    if xt not in GuardXTs :
+        return None
+    tb = e.__traceback__
+    while tb is not None :
+        if tb.tb_frame.f_code is xt.__code__ :     # raised by the unchecked XT itself
+            return GuardXTs[xt]
+        tb = tb.tb_next
+    return None
+#
+#============================
+#
+#   Compaction - run by "compact": definitions superseded by a redefinition or deleted by
+#   "deldef" stay in ExecList as long as something refers to them; the others are removed
+#   - reached: definitions in CoreDef, the execution string, the definitions running ( IP &
+#     return stack ), then all definitions called, jumped to, pushed by "*name" or inlined
+#     from a reached one
+#   - no ops left by repdef in place of inlined copies are removed too
+#   - all indexes relocated as by the peephole optimiser, plus IP, return stack, the
+#     stack effects verified & the side tables of ExecList; closures compiled again
+#   - indexes held as values on the stacks or in variables are not relocated
+#
+#============================
+#
+def compact():              # remove unreachable definitions from ExecList ; return (nb. defs, nb. entries)
+    global IP,Here,DefStart,InlineList
+    ExecList.headers()
+    defpos = ExecList.defpos
+    ends = dict(zip(defpos,defpos[1:]+[IdxRetJmp]))     # index of Def -> end of definition
+    def owner(idx):         # index of Def of the definition holding idx, None if outside
+        if isinstance(idx,int) and 0 <= idx < IdxRetJmp :
+            return ExecList.defat(idx)
+        return None
+    inlined = {}            # index of Def, None for execution string -> Defs of copies inlined
+    for rec in InlineList :
+        inlined.setdefault(owner(rec[0]),[]).append(rec[2])
+    refops = {xtcode(xt) for xt in RefXTs}
+    def refsin(start,stop,idxdef):  # Defs referred to by ExecList[start:stop]
+        found = [ExecList.args[i] for i in range(start,stop) if ExecList.ops[i] in refops]
+        return found + inlined.get(idxdef,[])
+    todo = [val[0] for val in CoreDef.values()] + [IP] + rstack
+    todo.extend(refsin(IdxRetJmp,len(ExecList),None))
+    reached = set()
+    while todo :
+        idxdef = owner(todo.pop())
+        if idxdef is None or idxdef in reached :
+            continue
+        reached.add(idxdef)
+        todo.extend(refsin(idxdef,ends[idxdef],idxdef))
+
+    alive = [True]*len(ExecList)
+    nbdefs = 0
+    for idxdef in defpos :
+        if idxdef not in reached :
+            nbdefs += 1
+            for i in range(idxdef,ends[idxdef]) :
+                alive[i] = False
+    opnop = xtcode(k_pass)
+    for i in range(IdxRetJmp) :
+        if ExecList.ops[i] == opnop and ExecList.args[i] == 'inline' :
+            alive[i] = False
+    if all(alive) :
+        return (0,0)
+    InlineList = [rec for rec in InlineList if alive[rec[0]]]
+    reloc = relocate(0,ExecList[:],alive)
+    IP = reloc(IP)
+    rstack[:] = [reloc(idx) for idx in rstack]
+    Here = reloc(Here)
+    DefStart = reloc(DefStart)
+    effects = {reloc(idx): eff for idx,eff in StackEffects.items() if alive[idx]}
+    StackEffects.clear()
+    StackEffects.update(effects)
+    closreset()
+    return (nbdefs,alive.count(False))
+#
+#============================
+#
 #   Internal Control Flow execution routines attached to external compiling words
 #
 #============================
 #
 def doCall():              # call word to execute
     global IP,PFA,ExecList
+    if switchclos and closready(ExecList.args[IP]) :
+        closentry(ExecList.args[IP])    # closure compiled word, executed without NEXT
+        return
     rpush(IP)               # save current index, will be popped by 'doRet()' and post-incremented by NEXT
                             # so it will point to the word following the call, as expected
-    IP = ExecList[IP][PFA]  # get index of callee & continue execution from here
+    IP = ExecList.args[IP]  # get index of callee & continue execution from here
 #
 #============================
 #
 def doJmp():               # jump to word to execute
     global IP,PFA,ExecList
-    IP = ExecList[IP][PFA]  # get index of word  & continue execution from here
+    IP = ExecList.args[IP]  # get index of word  & continue execution from here
                             # same as doCall() but without return saving
 #
 #============================
@@ -927,15 +1881,468 @@ def doIfneq():             # ( x y -- x y ) continue execution if x!=y, else bra
 #
 #============================
 #
+#   Loops compiled by "do ... loop", "begin ... until", "begin ... while ... repeat"
+#   - branches are direct: PFA holds the index of the entry after which execution continues
+#   - "do" keeps limit in LoopStack and index in I; the I,J,K of enclosing loops are
+#     shifted to J,K and restored at loop end, so "i j k" give the indexes of nested loops
+#
+LoopStack = []      # frames of running "do" loops: [limit, K saved at "do"]
+#
+def doDo():                # ( limit start -- ) enter counted loop, skip it if start >= limit
+    global IP,I,J,K
+    if len(dstack) < 2 :
+        abort('"do" needs limit & start, stack has 1 item or is empty')
+    elif not isinstance(tos(),int) or not isinstance(nos(),int) :
+        abort('Limit & start of "do" must be integers')
+    else:
+        start = dstack.pop()
+        limit = dstack.pop()
+        if start < limit :
+            LoopStack.append([limit,K])
+            K = J
+            J = I
+            I = start
+        else:
+            IP = ExecList.args[IP]  # continue after "loop"
+#
+#============================
+#
+def doLoop():              # I += 1 ; branch back after "do" while I < limit, else leave loop
+    global IP,I,J,K
+    I += 1
+    if I < LoopStack[-1][0] :
+        IP = ExecList.args[IP]
+    else:
+        I = J
+        J = K
+        K = LoopStack.pop()[1]
+#
+#============================
+#
+def loopreset():            # leave all running "do" loops, I,J,K as before them ; at abort
+    global I,J,K
+    while len(LoopStack) :
+        I = J
+        J = K
+        K = LoopStack.pop()[1]
+#
+#============================
+#
+def doUntil():             # branch back after "begin" if ZF=0
+    global IP
+    if not ZF :
+        IP = ExecList.args[IP]
+#
+#============================
+#
+def doWhile():             # continue if ZF=1, else leave loop after "repeat"
+    global IP
+    if not ZF :
+        IP = ExecList.args[IP]
+#
+#============================
+#
+def doRepeat():            # branch back after "begin"
+    global IP
+    IP = ExecList.args[IP]
+#
+BranchXTs = (doIf,doIfnot,doIfneq,doDo,doLoop,doUntil,doWhile,doRepeat)  # continue after entry PFA
+#
+#============================
+#
 def doLit():                # literal treatment: push PFA to Data Stack
     global IP,PFA,ExecList
-    dpush(ExecList[IP][PFA])
+    dpush(ExecList.args[IP])
 #
 #============================
 #
 def doLitx():               # literal treatment: push PFA to Data Stack
     global IP,PFA,ExecList  # same as doLit(), but used to differentiate between call by index or ordinary literal
-    dpush(ExecList[IP][PFA])
+    dpush(ExecList.args[IP])
+#
+RefXTs = (doCall,doJmp,doLitx)  # PFA is the index of a definition
+#
+#============================
+#
+#   Superinstructions - "lit op" fused by the peephole optimiser into a single entry
+#   [doLitOp, [literal, word]], the original words being kept in PFA
+#
+LitOps = {                  # word -> [operator, XT name, 1 if comparison setting ZF]
+            '+':  [operator.add,'k_plus()',0],
+            '-':  [operator.sub,'k_minus()',0],
+            '*':  [operator.mul,'k_star()',0],
+            '==': [operator.eq,'k_eq()',1],
+            '!=': [operator.ne,'k_neq()',1],
+            '<':  [operator.lt,'k_le()',1],
+            '>':  [operator.gt,'k_gt()',1],
+            '<=': [operator.le,'k_leeq()',1],
+            '>=': [operator.ge,'k_gteq()',1]
+            }
+#
+def litop(pfa):             # push literal & execute word ; numbers done here, else by the word itself
+    global ZF
+    val,w = pfa
+    op,xt,cmp = LitOps[w]
+    if len(dstack) and type(dstack[-1]) in (int,float) and type(val) in (int,float) :
+        if cmp :
+            ZF = 1 if op(dstack[-1],val) else 0
+            dstack.append(val)
+        else:
+            dstack[-1] = op(dstack[-1],val)
+    else:
+        dpush(val)
+        getxt(xt)()         # same checks & abort messages as the single word
+#
+def doLitOp():              # fused "lit op" : push PFA[0] & execute word PFA[1]
+    litop(ExecList.args[IP])
+#
+#============================
+#
+#   Closure compiled execution of definitions - switched ON by "closon"
+#   - at first call, a definition is compiled once into a chain of python closures:
+#     one closure per XT, "if/ifz/ifneq ... then" as nested blocks
+#   - calling the word is then a single python call, no walk of ExecList by IP through NEXT
+#   - tail jumps ("doJmp" compiled by ";") are looped by closrun, so recursion doesn't grow
+#   - definitions using XTs which change IP themselves (execidx, choose, iloop, ...) or calling
+#     such definitions are not compiled and keep running through NEXT
+#   - at abort, IP and the return stack are rebuilt, so diagnostics are the same as with NEXT
+#
+#============================
+#
+switchclos = 0      # closure compiled execution OFF
+InClos = 0          # 1 while executing closures, abort is then raised as ClosAbort
+ClosDict = {}       # index of definition in ExecList -> compiled closure, or None if not compilable
+ClosExcl = ('REPL','k_execidx','k_choose','k_lesszeq','k_lesseqgt','k_Iloop','k_Jloop','k_Kloop',
+            'k_load','k_load_aux','k_quit','k_dellast','k_compact','k_require',
+            'doDo','doLoop','doUntil','doWhile','doRepeat')    # XTs which modify IP
+#
+class ClosAbort(Exception):     # abort raised from closures, unwound to closentry
+    def __init__(self,fn,serr):
+        self.fn = fn            # abort or abortstk, called again after unwinding
+        self.serr = serr
+        self.ip = None          # index of aborted XT, set by the innermost block
+        self.rets = []          # indexes of calls crossed while unwinding, innermost first
+#
+#============================
+#
+def closret():              # closure for doRet: signal return from word
+    return -1
+#
+def closlit(entry):         # closure for doLit/doLitx
+    def lit():
+        dpush(entry[1])     # PFA read at execution, assignment words modify variables in place
+    return lit
+#
+def closlitop(entry):       # closure for doLitOp
+    def lop():
+        litop(entry[1])
+    return lop
+#
+def closjmp(idx):           # closure for doJmp: signal tail jump, looped by closrun
+    def jmp():
+        return idx
+    return jmp
+#
+def closcall(idx,idxcall):  # closure for doCall
+    def call():
+        try:
+            closrun(idx)
+        except ClosAbort as e:
+            e.rets.append(idxcall)
+            raise
+    return call
+#
+def closif(xt,block):       # closure for doIf/doIfnot/doIfneq, block holds the XTs until "then"
+    if xt is doIf :
+        def cond():
+            if ZF :
+                return block()
+    elif xt is doIfnot :
+        def cond():
+            if not ZF :
+                return block()
+    else:
+        def cond():
+            try:
+                if tos() != nos() :
+                    return block()
+            except(TypeError,ValueError) as e:
+                abort(str(e))
+    return cond
+#
+#============================
+#
+#   Top of stack register - switched ON by "regon", for closure compiled definitions
+#   - a run of stack, math & comparison words and literals without branches is compiled to one
+#     python function keeping TOS in a local variable: loaded from the data stack at the start
+#     of the run, spilled back at its end, so the data stack is complete again at every call,
+#     branch or abort, as seen by pds, jsdump ...
+#   - each word of the run raises a python error, stack & register untouched, if items are
+#     missing or of a wrong type; the register is then spilled and the rest of the run
+#     executed by the usual checked words, which abort with their own message
+#
+#============================
+#
+switchreg = 0       # TOS register OFF
+#
+def regable(xt):            # XT compiled in a register run
+    return xt is doLit or xt is doLitx or xt is doLitOp or GuardXTs.get(xt,xt) in RegOps
+#
+def regrun(idx,stop):       # indexes of the run of register XTs starting at idx, "then" skipped
+    run = []
+    while idx < stop and (ExecList[idx][CFA] is k_pass or regable(ExecList[idx][CFA])) :
+        if ExecList[idx][CFA] is not k_pass :
+            run.append(idx)
+        idx += 1
+    return run
+#
+def closreg(run):           # closure for a register run, list of indexes in ExecList
+    consts = []
+    lines = ['def run():','    global ZF','    d = dstack','    k = -1','    try:']
+    for n,idx in enumerate(run) :
+        entry = ExecList[idx]
+        xt = entry[CFA]
+        if xt is doLit or xt is doLitx :
+            lit = 'K['+str(len(consts))+']'
+            if ExecList[idx-1][CFA] is Def :    # variable, PFA read at execution
+                consts.append(entry)
+                lit += '[1]'
+            else:
+                consts.append(entry[PFA])
+            code = 't = '+lit if n == 0 else 'd.append(t)\nt = '+lit
+        else:
+            if n == 0 :
+                lines.append('        t = d.pop()')   # TOS loaded in the register
+            if xt is doLitOp :
+                lit = 'K['+str(len(consts))+']'
+                consts.append(entry[PFA][0])
+                op = entry[PFA][1]
+                if LitOps[op][2] :              # comparison, literal left on stack
+                    code = 'ZF = 1 if t '+op+' '+lit+' else 0\nd.append(t)\nt = '+lit
+                else:
+                    code = 't = t '+op+' '+lit
+            else:
+                code = RegOps[GuardXTs.get(xt,xt)]
+        lines.append('        k = '+str(n))
+        lines.extend(['        '+line for line in code.split('\n')])
+    lines.extend(['    except (IndexError,TypeError,ZeroDivisionError,ValueError) :',
+                  '        if k >= 0 :',
+                  '            d.append(t)',
+                  '        return max(k,0)        # index in run of the word to execute checked',
+                  '    d.append(t)'])
+    ns = {}
+    exec('def mkrun(K):\n'+'\n'.join(['    '+line for line in lines])+'\n    return run',globals(),ns)
+    fast = ns['mkrun'](tuple(consts))
+    checked = []
+    for idx in run :
+        xt = ExecList[idx][CFA]
+        if xt is doLit or xt is doLitx :
+            checked.append((idx,closlit(ExecList[idx])))
+        elif xt is doLitOp :
+            checked.append((idx,closlitop(ExecList[idx])))
+        else:
+            checked.append((idx,GuardXTs.get(xt,xt)))
+    
+    def reg():
+        k = fast()
+        if k is not None :
+            for ip,fn in checked[k:] :
+                try:
+                    fn()
+                except ClosAbort as e:
+                    if e.ip is None :
+                        e.ip = ip
+                    raise
+    return reg
+#
+#============================
+#
+def closblock(start,stop):  # compile ExecList[start:stop] to a block of closures
+    steps = []
+    idx = start
+    while idx < stop :
+        entry = ExecList[idx]
+        xt = entry[CFA]
+        if switchreg and regable(xt) :
+            run = regrun(idx,stop)
+            if len(run) > 1 :
+                steps.append((idx,closreg(run)))
+                idx = run[-1] + 1
+                continue
+        if xt is doIf or xt is doIfnot or xt is doIfneq :
+            steps.append((idx,closif(xt,closblock(idx+1,entry[PFA]+1))))
+            idx = entry[PFA] + 1    # continue after "then"
+            continue
+        elif xt is doLit or xt is doLitx :
+            steps.append((idx,closlit(entry)))
+        elif xt is doLitOp :
+            steps.append((idx,closlitop(entry)))
+        elif xt is doCall :
+            steps.append((idx,closcall(entry[PFA],idx)))
+        elif xt is doJmp :
+            steps.append((idx,closjmp(entry[PFA])))
+        elif xt is doRet :
+            steps.append((idx,closret))
+        elif xt is not k_pass :     # "then" is a no op, skip it
+            steps.append((idx,GuardXTs.get(xt,xt)))  # kernel primitive called directly
+        idx += 1
+    steps = tuple(steps)
+    
+    def block():
+        try:
+            for ip,fn in steps :
+                r = fn()
+                if r is not None :  # return or tail jump
+                    return r
+        except ClosAbort as e:
+            if e.ip is None :
+                e.ip = ip
+            raise
+    return block
+#
+#============================
+#
+def closscan(idx):          # find end of definition starting at idx & called definitions
+                            # return (end index, list of callees) or None if not compilable
+    callees = []
+    ifs = []
+    i = idx + 1
+    while i < len(ExecList) - 1 :
+        xt = ExecList[i][CFA]
+        if xt is Def or xt.__name__ in ClosExcl :
+            return None
+        if xt is doCall or xt is doJmp :
+            callees.append(ExecList[i][PFA])
+        elif xt is doIf or xt is doIfnot or xt is doIfneq :
+            ifs.append((i,ExecList[i][PFA]))
+        if xt is doRet or xt is doJmp :
+            if len(ifs) and max([idxthen for (j,idxthen) in ifs]) >= i :
+                i += 1              # definition continues after "then"
+                continue
+            for (j,idxthen) in ifs :    # every "then" must be inside the definition
+                if not (isinstance(idxthen,int) and j <= idxthen <= i) :
+                    return None
+            return (i+1,callees)
+        i += 1
+    return None
+#
+#============================
+#
+def closrecursive(scans):   # set of the definitions of scans reaching themselves back through a call
+    edges = {j:set(sc[1]) & scans.keys() for j,sc in scans.items()}   # calls & tail jumps
+    recursive = set()
+    for j,sc in scans.items() :
+        for i in range(j+1,sc[0]) :
+            if j not in recursive and ExecList[i][CFA] is doCall and ExecList[i][PFA] in scans :
+                seen = set()            # search j from the callee: a loop of tail jumps only is fine
+                todo = [ExecList[i][PFA]]
+                while todo :
+                    k = todo.pop()
+                    if k == j :
+                        recursive.add(j)
+                        break
+                    if k not in seen :
+                        seen.add(k)
+                        todo.extend(edges[k])
+    return recursive
+#
+def closready(idx):         # compile definition at idx & all definitions reached by it
+                            # return True if the closure is ready to run
+    if idx in ClosDict :
+        return ClosDict[idx] is not None
+    scans = {}
+    todo = [idx]
+    while todo :
+        j = todo.pop()
+        if j in scans or ClosDict.get(j,None) is not None :
+            continue
+        sc = None
+        if j not in ClosDict and isinstance(j,int) and 0 <= j < len(ExecList) and ExecList[j][CFA] is Def :
+            sc = closscan(j)
+        if sc is None :
+            ClosDict[idx] = None    # not compilable, run it with NEXT
+            return False
+        scans[j] = sc
+        todo.extend(sc[1])
+    if closrecursive(scans) :
+        ClosDict[idx] = None        # recursion would nest python calls, run it with NEXT
+        return False
+    for j in scans :
+        ClosDict[j] = closblock(j+1,scans[j][0])
+    return True
+#
+#============================
+#
+def closrun(idx):           # run closure of definition at idx ; tail jumps continue here
+    while True :
+        r = ClosDict[idx]()
+        if r is None or r < 0 :
+            return
+        idx = r
+#
+def closentry(idx):         # run closure from a call compiled in ExecList ; IP unchanged
+    global IP,InClos
+    InClos = 1
+    try:
+        closrun(idx)
+    except ClosAbort as e:
+        InClos = 0
+        rpush(IP)           # rebuild the return stack as NEXT would have it
+        for idxcall in reversed(e.rets) :
+            rpush(idxcall)
+        IP = e.ip
+        e.fn(e.serr)        # print abort diagnostics & back to REPL
+    except RecursionError :
+        InClos = 0
+        rpush(IP)           # shown as aborted at the entry of the word called
+        IP = idx
+        abort('Too many nested calls for closures, use "closoff"')
+    finally:
+        InClos = 0
+#
+def closreset():            # forget compiled closures, ExecList was modified
+    ClosDict.clear()
+#
+#============================
+#
+def runword(idx):           # run word at idx with NEXT until its return, inside the XT running or
+    global IP               # from a transpiled module ; an unchecked XT failing runs checked as in driver
+    rpush(IP)               # kept on the return stack, relocated if "require" inserts code
+    rpush(-2)               # return to -2, post-incremented by NEXT to -1: stop
+    IP = idx
+    while IP >= 0 :
+        try:
+            while IP >= 0 :
+                NEXT()
+        except (IndexError,TypeError,ZeroDivisionError) as e :
+            xt = unchecked(e)
+            if xt is None :
+                raise
+            xt()                    # checked word aborts with its own message
+            IP += 1                 # or, for types it accepts, did the job
+    IP = rpop()
+#
+#============================
+#
+def driver():               # top level loop: run ExecList with NEXT, back to REPL at each Restart
+    global IP,rstack
+    while IP < len(ExecList) :
+        try:
+            try:
+                while IP < len(ExecList.ops) :  # len of array, CodeList.__len__ is a python call
+                    NEXT()
+            except (IndexError,TypeError,ZeroDivisionError) as e :
+                xt = unchecked(e)
+                if xt is None :
+                    raise
+                xt()                        # checked word aborts with its own message
+                IP += 1                     # or, for types it accepts, did the job
+        except Restart :
+            rstack = [0]                    # unsolved RETs of aborted words
+            loopreset()
+            if ExecList[-1][CFA] != REPL :  # REPL unwound before appending itself
+                ExecList.append([REPL,'REPL'])
+            IP = len(ExecList) - 1          # next XT executed is REPL
 #
 #============================
 # end of REPL/compiler part
@@ -1008,7 +2415,7 @@ def k_prs():                    # ( -- ) print Return Stack
         print(' Return stack items:' + str(len(rstack)-1))
         for i in range(len(rstack)-1,0,-1) :
             idxret = rstack[i]
-            if ExecList[idxret][CFA] == 'doCall()' :
+            if ExecList[idxret][CFA] == doCall :
                 idxcall = ExecList[idxret][PFA]
                 print(i,'return from:',ExecList[idxcall][PFA])
             else:
@@ -1111,59 +2518,91 @@ def k_pddef():                  # ( defname -- ) print a definition
                 idx = defval[0]
                 k_pddef_aux(idx)    # print last declared definition with same name, found in CoreDef
 #               see if duplicate present 
-                nbdef = ExecList.count(['Def()',tos()])
+                heads = ExecList.headers().get(tos(),[])
+                nbdef = len(heads)
                 if nbdef == 1 :
                     print('  No duplicate (older definitions) present')
                 else:
                     print('  There are',nbdef-1,'older definitions')
-                    idxcontinue = 0
                     for i in range(nbdef-1) :
-                        idx = ExecList.index(['Def()',tos()],idxcontinue)
-                        print('  Duplicate',i+1,'at index',idx)
-                        k_pddef_aux(idx)
-                        idxcontinue = idx+1
+                        print('  Duplicate',i+1,'at index',heads[i])
+                        k_pddef_aux(heads[i])
                 k_drop()
                 
 #============================
 def k_pddef_aux(idx):
     global ExecList,CFA,PFA
+    thens = []              # indexes where execution continues after "if/ifz/ifneq": print "then" there
+    loopends = []           # indexes where execution continues after "do/while" loops
+    begins = [ExecList.args[i]+1 for i in range(idx,len(ExecList))     # "begin" compiles no entry,
+              if ExecList[i][CFA] in (doUntil,doRepeat) and ExecList.args[i] >= idx]  # loops tell where
+    inlined = {rec[0]:rec for rec in InlineList}
     while idx < len(ExecList) - 1 :
-        if ExecList[idx][CFA] == 'Def()' :
+        while idx in thens :
+            print('then',end=' ')
+            thens.remove(idx)
+        while idx in begins :
+            print('begin',end=' ')
+            begins.remove(idx)
+        if idx in inlined :     # inlined copy, print name of word
+            print(ExecList[inlined[idx][2]][PFA],end=' ')
+            idx = inlined[idx][1]
+            continue
+        if ExecList[idx][CFA] == Def :
             print(' ',ExecList[idx][PFA]+':',end=' ')
-        elif ExecList[idx][CFA] == 'doRet()' :
-            print(';',end=' ')
-            idx += 1
-            if ExecList[idx][PFA] == 'then' :
-                continue
+        elif ExecList[idx][CFA] == doRet or ExecList[idx][CFA] == doJmp :
+            if ExecList[idx][CFA] == doRet :
+                print(';',end=' ')
             else:
-                print()
-            break
-        elif ExecList[idx][CFA] == 'doJmp()':
-            jdx = ExecList[idx][PFA]
-            print(ExecList[jdx][PFA]+' ;',end=' ')
+                jdx = ExecList[idx][PFA]
+                print(ExecList[jdx][PFA]+' ;',end=' ')
             idx += 1
-            if ExecList[idx][PFA] == 'then' :
+            if len(thens+loopends) and max(thens+loopends) >= idx :   # definition continues after "then"
                 continue
             else:
                 print()
                 break
-        elif ExecList[idx][CFA] == 'doCall()' :
+        elif ExecList[idx][CFA] == doCall :
             jdx = ExecList[idx][PFA]
             print(ExecList[jdx][PFA],end=' ')
-        elif ExecList[idx][CFA] == 'doIf()' :
+        elif ExecList[idx][CFA] == doIf :
             print('if',end=' ')
-        elif ExecList[idx][CFA] == 'doIfnot()' :
+            thens.append(ExecList[idx][PFA]+1)
+        elif ExecList[idx][CFA] == doIfnot :
             print('ifz',end=' ')
-        elif ExecList[idx][CFA] == 'doIfneq()' :
+            thens.append(ExecList[idx][PFA]+1)
+        elif ExecList[idx][CFA] == doIfneq :
             print('ifneq',end=' ')
-        elif ExecList[idx][CFA] == 'doLitx()' :
+            thens.append(ExecList[idx][PFA]+1)
+        elif ExecList[idx][CFA] == doDo :
+            print('do',end=' ')
+            loopends.append(ExecList[idx][PFA]+1)
+        elif ExecList[idx][CFA] == doWhile :
+            print('while',end=' ')
+            loopends.append(ExecList[idx][PFA]+1)
+        elif ExecList[idx][CFA] == doLoop :
+            print('loop',end=' ')
+        elif ExecList[idx][CFA] == doUntil :
+            print('until',end=' ')
+        elif ExecList[idx][CFA] == doRepeat :
+            print('repeat',end=' ')
+        elif ExecList[idx][CFA] == k_pass and ExecList[idx][PFA] in ('then','inline','begin') :
+            pass            # "then" printed at next entry, as for optimised defs without "then" ;
+                            # "begin" of images saved when it compiled an entry, printed by its loop
+        elif ExecList[idx][CFA] == doLitx :
             jdx = ExecList[idx][PFA]
             print('*'+ExecList[jdx][PFA],end=' ')
-        elif ExecList[idx][CFA] == 'doLit()' :
+        elif ExecList[idx][CFA] == doLit :
             if isinstance(ExecList[idx][PFA],str) :
                 print('"',ExecList[idx][PFA]+'"',end=' ')
             else:
                 print(ExecList[idx][PFA],end=' ')
+        elif ExecList[idx][CFA] == doLitOp :     # superinstruction, print original words
+            if isinstance(ExecList[idx][PFA][0],str) :
+                print('"',ExecList[idx][PFA][0]+'"',end=' ')
+            else:
+                print(ExecList[idx][PFA][0],end=' ')
+            print(ExecList[idx][PFA][1],end=' ')
         else:
             print(ExecList[idx][PFA],end=' ')
         idx += 1
@@ -1186,33 +2625,46 @@ def k_pexlst():                  # ( idx -- ) print execution list starting with
             fin = 50 + n
         for i in range(n,fin) :
             print(str(i).rjust(5),end=' ')
-            if ExecList[i][CFA] == 'Def()' :
+            if ExecList[i][CFA] == Def :
                 print(ExecList[i][PFA] + ':')
                 continue
-            elif ExecList[i][CFA] == 'doCall()' :
+            elif ExecList[i][CFA] == doCall :
                 j = ExecList[i][PFA]
                 print('call ' + ExecList[j][PFA])
                 continue
-            elif ExecList[i][CFA] == 'doJmp()' :
+            elif ExecList[i][CFA] == doJmp :
                 j = ExecList[i][PFA]
                 print('jump ' + ExecList[j][PFA])
                 continue
-            elif ExecList[i][CFA] == 'doLit()' :
+            elif ExecList[i][CFA] == doLit :
                 print('lit ',end = ' ')
                 print(ExecList[i][PFA])
                 continue
-            elif ExecList[i][CFA] == 'doLitx()' :
+            elif ExecList[i][CFA] == doLitOp :
+                print('lit ',end = ' ')
+                print(ExecList[i][PFA][0],ExecList[i][PFA][1])
+                continue
+            elif ExecList[i][CFA] == doLitx :
                 j = ExecList[i][PFA]
                 print('pointer to ' + ExecList[j][PFA])
                 continue
-            elif ExecList[i][CFA] == 'doIf()' :
-                print('if - then at: ' + str(ExecList[i][PFA]))
+            elif ExecList[i][CFA] == doIf :
+                print('if - else continue at: ' + str(ExecList[i][PFA]+1))
+                continue
+            elif ExecList[i][CFA] == doIfnot :
+                print('ifz - else continue at: ' + str(ExecList[i][PFA]+1))
+                continue
+            elif ExecList[i][CFA] == doIfneq :
+                print('ifneq - else continue at: ' + str(ExecList[i][PFA]+1))
                 continue
-            elif ExecList[i][CFA] == 'doIfnot()' :
-                print('ifz - then at: ' + str(ExecList[i][PFA]))
+            elif ExecList[i][CFA] == doDo :
+                print('do - if empty continue at: ' + str(ExecList[i][PFA]+1))
                 continue
-            elif ExecList[i][CFA] == 'doIfneq()' :
-                print('ifneq - then at: ' + str(ExecList[i][PFA]))
+            elif ExecList[i][CFA] == doWhile :
+                print('while - else continue at: ' + str(ExecList[i][PFA]+1))
+                continue
+            elif ExecList[i][CFA] in (doLoop,doUntil,doRepeat) :
+                print(ExecList[i][CFA].__name__[2:].lower() + ' - back to: ' + str(ExecList[i][PFA]+1))
                 continue
             else:
                 print(ExecList[i][PFA])
@@ -1289,16 +2741,33 @@ def k_plist():                  # ( list -- ) print list as enumerated elements
 #
 #============================
 #
+def wordname(idx):          # name of word compiled at idx, as shown in abort messages
+    pfa = ExecList[idx][PFA]
+    if ExecList[idx][CFA] == doLitOp :
+        return pfa[1]       # superinstruction aborted by its word
+    if ExecList[idx][CFA] == doDo :
+        return 'do'
+    return str(pfa)
+#
+#============================
+#
+class Restart(Exception):       # raised by abort, load, ... : Python frames unwound to driver, which restarts REPL
+    pass
+#
+#============================
+#
 def abort(serr):               # show TOS & NOS at *execution* errors
     global rstack
-    print('"'+ExecList[IP][PFA]+'"'+' aborted: ' + serr)
+    if InClos :                 # unwind closures first, abort is called again by closentry
+        raise ClosAbort(abort,serr)
+    print('"'+wordname(IP)+'"'+' aborted: ' + serr)
     print(' Aborted at Execution List Index: ' ,IP)
     idx = IP
     while idx > 0 :
-        if ExecList[idx][CFA] == 'Def()' :
+        if ExecList[idx][CFA] == Def :
             print(' In definition: '+'"'+ExecList[idx][PFA]+'" at index: '+str(idx))
             break
-        elif ExecList[idx][CFA] == 'doRet()' or ExecList[idx][CFA] == 'doJmp()':
+        elif ExecList[idx][CFA] == doRet or ExecList[idx][CFA] == doJmp:
             print(' Aborted in execution string or in definition with multiple returns')
             break
         elif idx == 1 :
@@ -1316,7 +2785,9 @@ def abort(serr):               # show TOS & NOS at *execution* errors
     if len(rstack) > 1 :        # print Return Stack
         k_prs()
         rstack = [0]            # empty Return Stack, as unsolved RETs may remain after aborting
-    REPL()                      
+    if Batch is not None :
+        batchexit(1)
+    raise Restart               # unwind to driver, back to REPL
 #
 #============================
 #
@@ -1333,14 +2804,16 @@ def k_abort():              # ( str -- ) abort with user message
 #
 def abortstk(serr):        # show error messages at stack manipulation
     global rstack
-    print('"'+ExecList[IP][PFA]+'"'+' aborted: ' + serr)
+    if InClos :                 # unwind closures first, abortstk is called again by closentry
+        raise ClosAbort(abortstk,serr)
+    print('"'+wordname(IP)+'"'+' aborted: ' + serr)
     print(' Index: ' ,IP)
     idx = IP
     while idx > 0 :
-        if ExecList[idx][CFA] == 'Def()' :
+        if ExecList[idx][CFA] == Def :
             print(' In definition: '+'"'+ExecList[idx][PFA]+'" at index: '+str(idx))
             break
-        elif ExecList[idx][CFA] == 'doRet()' or ExecList[idx][CFA] == 'doJmp()':
+        elif ExecList[idx][CFA] == doRet or ExecList[idx][CFA] == doJmp:
             print(' Aborted in execution string or in definition with multiple returns')
             break
         elif idx == 1 :
@@ -1351,7 +2824,9 @@ def abortstk(serr):        # show error messages at stack manipulation
     if len(rstack) > 1 :     # print Return Stack
         k_prs()
         rstack = [0]         # empty Return Stack, as unsolved RETs may remain after aborting
-    REPL()                    
+    if Batch is not None :
+        batchexit(1)
+    raise Restart            # unwind to driver, back to REPL
 #
 #============================
 #
@@ -1508,18 +2983,24 @@ def k_pick():    # ( xn xn-1 xn-2 ... x0 n -- xn xn-1 xn-2 ... x0 xn ) replace T
 #
 #============================
 #
+MathOps = {                 # op -> python function, no code string compiled at execution
+            '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+            '//': operator.floordiv, '%': operator.mod, '**': operator.pow
+            }
+#
 def k_commonmath(op):
     if len(dstack) < 2 :
         abort('Math "' + op + '" needs 2 items, stack has 1 item or is empty')
     else:
+        x = dstack[-2]
+        y = dstack[-1]
         try:
-            y = dpop()
-            x = dpop()
-            exec('dpush(x ' + op + ' y)')
+            z = MathOps[op](x,y)
         except (ZeroDivisionError,TypeError) as e:
-            dpush(x)
-            dpush(y)
-            abort(str(e))
+            abort(str(e))   # x y left on stack
+        else:
+            del dstack[-1]
+            dstack[-1] = z
 #
 #============================
 #
@@ -1583,7 +3064,9 @@ def k_dblstar():                     # ( x y -- x**y ) NOS at TOS power
 #============================
 #
 def k_plusone():                    # increment TOS by 1
-    if len(dstack) < 1 :
+    if len(dstack) and type(dstack[-1]) in (int,float) :     # fast path for numbers
+        dstack[-1] += 1
+    elif len(dstack) < 1 :
         abort('Math "++" needs 1 item, stack empty')
     elif not isinstance(tos(), (int,float,complex)):
         abort('Value for "++" must be of type (int,float,complex)')
@@ -1594,7 +3077,9 @@ def k_plusone():                    # increment TOS by 1
 #============================
 #
 def k_minusone():                  # decrement TOS by 1
-    if len(dstack) < 1 :
+    if len(dstack) and type(dstack[-1]) in (int,float) :     # fast path for numbers
+        dstack[-1] -= 1
+    elif len(dstack) < 1 :
         abort('Math "--" needs 1 item, stack empty')
     elif not isinstance(tos(), (int,float,complex)):
         abort('Value for "--" must be of type (int,float,complex)')
@@ -1641,29 +3126,38 @@ def k_round():                   # ( n i -- round(n))  n rounded to i digits
 #============================
 #
 def k_min():                     # ( seq  -- min(seq) ) minimum of values in sequence seq
-  if not isinstance (tos(), (tuple,list,dict,set))  : 
+  if not isinstance (tos(), (tuple,list,dict,set,Iterator)+VecTypes)  : 
     abort('Argument of "min" must be a sequence with at least 2 items')
   else:
-    seq = dpop()
-    dpush(min(seq))  
+    try:
+      dpush(vecreduce(min,tos()))
+      k_nip()
+    except (ValueError,OSError) as e:   # empty sequence, reading the items of a file
+      abort(str(e))  
 #
 #============================
 #
 def k_max():                     # ( seq  -- max(seq) ) maximum of values in sequence seq
-  if not isinstance (tos(), (tuple,list,dict,set))  :
+  if not isinstance (tos(), (tuple,list,dict,set,Iterator)+VecTypes)  :
     abort('Argument of "max" must be a sequence with at least 2 items')
   else:
-    seq = dpop()
-    dpush(max(seq))  
+    try:
+      dpush(vecreduce(max,tos()))
+      k_nip()
+    except (ValueError,OSError) as e:   # empty sequence, reading the items of a file
+      abort(str(e))  
 #
 #============================
 #
 def k_sum():                     # ( seq -- sum(seq) ) sum of  items in sequence seq
-  if not isinstance (tos(), (tuple,list,dict,set))  :
+  if not isinstance (tos(), (tuple,list,dict,set,Iterator)+VecTypes)  :
     abort('Argument of "sum" must be a sequence')
   else:
-    seq = dpop()
-    dpush(sum(seq)) 
+    try:
+      dpush(vecreduce(sum,tos()))
+      k_nip()
+    except (ValueError,OSError) as e:   # reading the items of a file
+      abort(str(e)) 
 #
 #============================
 #
@@ -1746,13 +3240,18 @@ def k_mulval():                     # ( n1 n2 ... ni i -- product(ni) ) product
 #
 #============================
 #
+CompOps = {                 # op -> python function
+            '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+            '==': operator.eq, '!=': operator.ne
+            }
+#
 def k_commoncompare(op):
     global ZF 
     if len(dstack) < 2 :
         abort('Comparison "' + op + '" needs 2 items, stack has 1 item or is empty')
     else:
         try:
-            if eval('nos()' + op + 'tos()') :
+            if CompOps[op](dstack[-2],dstack[-1]) :
                 ZF = 1
             else:
                 ZF = 0
@@ -1804,7 +3303,7 @@ def k_commonzerocomp(op):
         abort('Comparison with 0 needs 1 item, stack empty')
     else:
         try:
-            if eval('tos()' + op + ' 0') :
+            if CompOps[op](dstack[-1],0) :
                 ZF = 1
             else:
                 ZF = 0
@@ -1837,6 +3336,138 @@ def k_zgt():                      # ( n -- n ) ZF = 1 if n>0
 #
 #============================
 #
+#   Unchecked variants of stack, math & comparison words, used by verified definitions
+#   - no test of depth or types: an item missing or of a wrong type raises IndexError,
+#     TypeError ... before the stack is modified, the checked word is then run by driver
+#
+#============================
+#
+def u_dup():                 # ( n -- n n ) unchecked dup
+    dstack.append(dstack[-1])
+#
+def u_ddup():                # ( x y -- x y x y ) unchecked 2dup
+    dstack.extend((dstack[-2],dstack[-1]))
+#
+def u_drop():                # ( n -- ) unchecked drop
+    dstack.pop()
+#
+def u_ddrop():               # ( x y -- ) unchecked 2drop
+    dstack[-2]                  # IndexError if less than 2 items
+    del dstack[-2:]
+#
+def u_swap():                # ( x y -- y x ) unchecked swap
+    dstack[-2],dstack[-1] = dstack[-1],dstack[-2]
+#
+def u_over():                # ( x y -- x y x ) unchecked over
+    dstack.append(dstack[-2])
+#
+def u_nip():                 # ( x y -- y ) unchecked nip
+    del dstack[-2]
+#
+def u_tuck():                # ( x y -- y x y ) unchecked tuck
+    dstack[-2:] = [dstack[-1],dstack[-2],dstack[-1]]
+#
+def u_rot():                 # ( x y z -- y z x ) unchecked rot
+    dstack[-3:] = [dstack[-2],dstack[-1],dstack[-3]]
+#
+def u_rotl():                # ( x y z -- z x y ) unchecked -rot
+    dstack[-3:] = [dstack[-1],dstack[-3],dstack[-2]]
+#
+def u_plus():                # ( x y -- x+y ) unchecked +
+    dstack[-2:] = [dstack[-2] + dstack[-1]]
+#
+def u_minus():               # ( x y -- x-y ) unchecked -
+    dstack[-2:] = [dstack[-2] - dstack[-1]]
+#
+def u_star():                # ( x y -- x*y ) unchecked *
+    dstack[-2:] = [dstack[-2] * dstack[-1]]
+#
+def u_slash():               # ( x y -- x/y ) unchecked /
+    dstack[-2:] = [dstack[-2] / dstack[-1]]
+#
+def u_dblslash():            # ( x y -- x//y ) unchecked //
+    dstack[-2:] = [dstack[-2] // dstack[-1]]
+#
+def u_rem():                 # ( x y -- rem ) unchecked %
+    dstack[-2:] = [dstack[-2] % dstack[-1]]
+#
+def u_plusone():             # ( n -- n+1 ) unchecked ++, numbers only
+    if type(dstack[-1]) not in (int,float) :
+        raise TypeError     # other types checked by "++"
+    dstack[-1] += 1
+#
+def u_minusone():            # ( n -- n-1 ) unchecked --, numbers only
+    if type(dstack[-1]) not in (int,float) :
+        raise TypeError
+    dstack[-1] -= 1
+#
+def u_le():                  # ( x y -- x y ) unchecked <
+    global ZF
+    ZF = 1 if dstack[-2] < dstack[-1] else 0
+#
+def u_gt():                  # ( x y -- x y ) unchecked >
+    global ZF
+    ZF = 1 if dstack[-2] > dstack[-1] else 0
+#
+def u_leeq():                # ( x y -- x y ) unchecked <=
+    global ZF
+    ZF = 1 if dstack[-2] <= dstack[-1] else 0
+#
+def u_gteq():                # ( x y -- x y ) unchecked >=
+    global ZF
+    ZF = 1 if dstack[-2] >= dstack[-1] else 0
+#
+def u_eq():                  # ( x y -- x y ) unchecked ==
+    global ZF
+    ZF = 1 if dstack[-2] == dstack[-1] else 0
+#
+def u_neq():                 # ( x y -- x y ) unchecked !=
+    global ZF
+    ZF = 1 if dstack[-2] != dstack[-1] else 0
+#
+def u_zeq():                 # ( n -- n ) unchecked =0
+    global ZF
+    ZF = 1 if dstack[-1] == 0 else 0
+#
+def u_zneq():                # ( n -- n ) unchecked !=0
+    global ZF
+    ZF = 1 if dstack[-1] != 0 else 0
+#
+FastXTs = {                  # checked XT -> unchecked variant
+            k_dup: u_dup, k_ddup: u_ddup, k_drop: u_drop, k_ddrop: u_ddrop, k_swap: u_swap,
+            k_over: u_over, k_nip: u_nip, k_tuck: u_tuck, k_rot: u_rot, k_rotl: u_rotl,
+            k_plus: u_plus, k_minus: u_minus, k_star: u_star, k_slash: u_slash,
+            k_dblslash: u_dblslash, k_rem: u_rem, k_plusone: u_plusone, k_minusone: u_minusone,
+            k_le: u_le, k_gt: u_gt, k_leeq: u_leeq, k_gteq: u_gteq, k_eq: u_eq, k_neq: u_neq,
+            k_zeq: u_zeq, k_zneq: u_zneq
+            }
+GuardXTs = {fast: xt for xt,fast in FastXTs.items()}    # unchecked variant -> checked XT
+#
+RegOps = {                   # checked XT -> code with TOS in register t, NOS in d[-1], see closreg
+            k_dup: 'd.append(t)',
+            k_ddup: 'd.extend((t,d[-1]))',
+            k_drop: 't = d.pop()',
+            k_ddrop: 'n = d[-2]\ndel d[-2:]\nt = n',
+            k_swap: 't,d[-1] = d[-1],t',
+            k_over: 'n = d[-1]\nd.append(t)\nt = n',
+            k_nip: 'del d[-1]',
+            k_tuck: 'd[-1:] = [t,d[-1]]',
+            k_rot: 'n = d[-2]\nd[-2:] = [d[-1],t]\nt = n',
+            k_rotl: 'n = d[-1]\nd[-2:] = [t,d[-2]]\nt = n',
+            k_plusone: 'if type(t) not in (int,float) : raise TypeError\nt += 1',
+            k_minusone: 'if type(t) not in (int,float) : raise TypeError\nt -= 1',
+            k_zeq: 'ZF = 1 if t == 0 else 0',
+            k_zneq: 'ZF = 1 if t != 0 else 0',
+            k_zle: 'ZF = 1 if t < 0 else 0',
+            k_zgt: 'ZF = 1 if t > 0 else 0'
+            }
+for xt,op in ((k_plus,'+'),(k_minus,'-'),(k_star,'*'),(k_slash,'/'),(k_dblslash,'//'),(k_rem,'%')) :
+    RegOps[xt] = 't = d[-1] '+op+' t\ndel d[-1]'
+for xt,op in ((k_le,'<'),(k_gt,'>'),(k_leeq,'<='),(k_gteq,'>='),(k_eq,'=='),(k_neq,'!=')) :
+    RegOps[xt] = 'ZF = 1 if d[-1] '+op+' t else 0'
+#
+#============================
+#
 def k_lesszeq():                 # ( idx1 idx2 idx3 n -- ) if n<0 execute idx1; if n=0 execute idx2; else idx3
     global IP
     
@@ -2077,6 +3708,8 @@ def k_bitcompl():                # ( n -- ~n ) one's complement
 #
 #============================
 #
+ShiftOps = {'<<': operator.lshift, '>>': operator.rshift}
+#
 def k_commonshift(op):
     if len(dstack) < 2 :
         abort('Bitwise "' + op + '" needs 2 items, stack has 1 item or is empty')
@@ -2087,7 +3720,12 @@ def k_commonshift(op):
     else:
         i = dpop()
         n = dpop()
-        exec('dpush(n ' + op +' i)')
+        try:
+            dpush(ShiftOps[op](n,i))
+        except ValueError as e:     # negative shift count
+            dpush(n)
+            dpush(i)
+            abort(str(e))
 #
 #============================
 #
@@ -2107,6 +3745,11 @@ def k_rshift():                  # ( n i -- n ) shift right n by i bits
 #
 #============================
 #
+AssignOps = {               # op -> python function, in place for mutable values as "+=" does
+            '=': lambda x,y: y, '+=': operator.iadd, '-=': operator.isub, '*=': operator.imul,
+            '/=': operator.itruediv, '//=': operator.ifloordiv, '%=': operator.imod, '**=': operator.ipow
+            }
+#
 def k_commonassign(op):
     if len(dstack) < 2 :
         abort('Assignment "' + op + '" needs 2 items, stack has 1 item or is empty')
@@ -2114,11 +3757,16 @@ def k_commonassign(op):
         abort('Index of variable is not an integer')
     elif tos() < 0 or tos() not in range (len(ExecList)) :
         abort('Index out of execution list range 0:' + str(len(ExecList)))
-    elif not str(ExecList[tos()+1][CFA]) == 'doLit()' and not str(ExecList[tos()+1][CFA]) == 'doLitx()':
+    elif not ExecList[tos()+1][CFA] == doLit and not ExecList[tos()+1][CFA] == doLitx:
         abort('"' + str(ExecList[tos()][PFA]) + '"' + ' is not a variable, no assignment allowed')
     else:
-        exec('ExecList[tos()+1][PFA]' + op + ' nos()')
-        k_ddrop()
+        entry = ExecList[dstack[-1]+1]
+        try:
+            entry[PFA] = AssignOps[op](entry[PFA],dstack[-2])
+        except (ZeroDivisionError,TypeError) as e:
+            abort(str(e))
+        else:
+            k_ddrop()
 #
 #============================
 #
@@ -2636,6 +4284,389 @@ def k_delijkthird():                     # ( list -- list ) delete item at K fro
 #
 #============================
 #
+#   Vector words - numbers of a sequence as a vector, computed item by item by one kernel word:
+#   a loop of interpreted steps becomes a single call
+#   - NumPy arrays if NumPy is installed, else arrays of module array: integers ( 'q' ) if all
+#     items are, else floats ( 'd' ), computed by map in C
+#   - a number with a vector applies to all its items: "v 2 v*" doubles v
+#   - comparisons give masks, vectors of 1/0 ( booleans with NumPy ), used by "vsel"
+#   - "sum", "min", "max" & "len" accept vectors; "vlist" gives a list back, to be saved by
+#     "save" in a variable
+#
+#============================
+#
+VecTypes = (array,) if numpy is None else (numpy.ndarray,array)
+#
+def vector(items):          # numeric vector of the numbers of sequence items
+    if numpy is not None :
+        vec = numpy.asarray(list(items) if isinstance(items,(set,dict,range)) else items)
+        if vec.dtype.kind not in 'biuf' or vec.ndim != 1 :
+            raise TypeError('vector items must be numbers, not nested')
+        return vec
+    items = list(items)
+    if all(type(x) is int or type(x) is bool for x in items) :
+        try:
+            return array('q',items)
+        except OverflowError :
+            pass            # too big for 64 bits, as floats
+    return array('d',items)
+#
+def vecunsaved(items):      # ValueError if a vector is found in items, nested ones too:
+    todo = [items]          # marshal would save it as raw bytes, loaded back as bytes
+    while todo :
+        x = todo.pop()
+        if isinstance(x,VecTypes) :
+            raise ValueError('vectors must be converted with vlist before save')
+        elif isinstance(x,(list,tuple,set,frozenset)) :
+            todo.extend(x)
+        elif isinstance(x,dict) :
+            todo.extend(x.keys())
+            todo.extend(x.values())
+#
+def vecreduce(fn,seq):      # fn ( sum, min or max ) of seq ; NumPy arrays reduced by NumPy, to a python number
+    if numpy is not None and isinstance(seq,numpy.ndarray) :
+        return getattr(numpy,fn.__name__)(seq).item()
+    return fn(seq)
+#
+def vecmap(op,x,y):         # op applied item by item to x & y, vectors or numbers ; vector of the results
+    if numpy is not None :
+        with numpy.errstate(divide='raise',invalid='raise') :
+            return op(x,y)
+    if isinstance(x,VecTypes) and isinstance(y,VecTypes) and len(x) != len(y) :
+        raise ValueError('vectors of different lengths: '+str(len(x))+' and '+str(len(y)))
+    return vector(map(op,x if isinstance(x,VecTypes) else repeat(x),y if isinstance(y,VecTypes) else repeat(y)))
+#
+def vecmask(op,x,y):        # mask of op applied item by item to x & y, vectors or numbers
+    if numpy is not None :
+        return op(x,y)
+    return array('b',vecmap(op,x,y))
+#
+def k_commonvec(op,name,mask=False):    # ( x y -- v ) op item by item, x or y a vector
+    if len(dstack) < 2 :
+        abort('Vector "' + name + '" needs 2 items, stack has 1 item or is empty')
+    elif not (isinstance(nos(),VecTypes) or isinstance(tos(),VecTypes)) :
+        abort('Vector "' + name + '" needs a vector, with a vector or a number')
+    else:
+        x = dstack[-2]
+        y = dstack[-1]
+        try:
+            z = vecmask(op,x,y) if mask else vecmap(op,x,y)
+        except (ZeroDivisionError,FloatingPointError,OverflowError,TypeError,ValueError) as e:
+            abort(str(e))   # x y left on stack
+        else:
+            del dstack[-1]
+            dstack[-1] = z
+#
+#============================
+#
+def k_vec():                # ( seq -- vec ) numeric vector of the numbers in seq
+    if len(dstack) < 1 :
+        abort('Missing argument for "vec"')
+    elif not isinstance(tos(),(tuple,list,set,dict,range)+VecTypes) :
+        abort('Argument of "vec" must be a sequence')
+    else:
+        try:
+            dstack[-1] = vector(tos())
+        except (TypeError,ValueError) as e:
+            abort(str(e))
+#
+def k_vlist():              # ( vec -- list ) list of the numbers in vector vec
+    if len(dstack) < 1 :
+        abort('Missing argument for "vlist"')
+    elif not isinstance(tos(),VecTypes) :
+        abort('Argument of "vlist" must be a vector')
+    else:
+        dstack[-1] = tos().tolist()
+#
+#============================
+#
+def k_vplus():              # ( x y -- v ) add item by item
+    k_commonvec(operator.add,'v+')
+#
+def k_vminus():             # ( x y -- v ) subtract item by item
+    k_commonvec(operator.sub,'v-')
+#
+def k_vstar():              # ( x y -- v ) multiply item by item
+    k_commonvec(operator.mul,'v*')
+#
+def k_vslash():             # ( x y -- v ) divide item by item - floating point division
+    k_commonvec(operator.truediv,'v/')
+#
+#============================
+#
+def k_vle():                # ( x y -- mask ) mask of x<y item by item
+    k_commonvec(operator.lt,'v<',True)
+#
+def k_vgt():                # ( x y -- mask ) mask of x>y item by item
+    k_commonvec(operator.gt,'v>',True)
+#
+def k_vleeq():              # ( x y -- mask ) mask of x<=y item by item
+    k_commonvec(operator.le,'v<=',True)
+#
+def k_vgteq():              # ( x y -- mask ) mask of x>=y item by item
+    k_commonvec(operator.ge,'v>=',True)
+#
+def k_veq():                # ( x y -- mask ) mask of x==y item by item
+    k_commonvec(operator.eq,'v==',True)
+#
+def k_vneq():               # ( x y -- mask ) mask of x!=y item by item
+    k_commonvec(operator.ne,'v!=',True)
+#
+#============================
+#
+def k_vsel():               # ( vec mask -- vec ) vector of the items of vec where mask is 1
+    if len(dstack) < 2 :
+        abort('"vsel" needs a vector & a mask, stack has 1 item or is empty')
+    elif not isinstance(nos(),VecTypes) or not isinstance(tos(),VecTypes) :
+        abort('Arguments of "vsel" must be a vector & a mask')
+    elif len(nos()) != len(tos()) :
+        abort('Vector & mask of "vsel" of different lengths: '+str(len(nos()))+' and '+str(len(tos())))
+    else:
+        mask = dpop()
+        if numpy is not None :
+            dstack[-1] = tos()[numpy.asarray(mask,dtype=bool)]
+        else:
+            dstack[-1] = vector(compress(tos(),mask))
+#
+def k_vdot():               # ( vec1 vec2 -- x ) dot product of vec1 & vec2
+    if len(dstack) < 2 :
+        abort('"vdot" needs 2 vectors, stack has 1 item or is empty')
+    elif not isinstance(nos(),VecTypes) or not isinstance(tos(),VecTypes) :
+        abort('Arguments of "vdot" must be vectors')
+    elif len(nos()) != len(tos()) :
+        abort('Vectors of "vdot" of different lengths: '+str(len(nos()))+' and '+str(len(tos())))
+    else:
+        y = dpop()
+        x = dpop()
+        if numpy is not None :
+            dpush(numpy.dot(x,y).item())    # python number, as the other words push
+        else:
+            dpush(sum(map(operator.mul,x,y)))
+#
+def k_vcumsum():            # ( vec -- vec ) vector of the cumulative sums of vec
+    if len(dstack) < 1 :
+        abort('Missing argument for "vcumsum"')
+    elif not isinstance(tos(),VecTypes) :
+        abort('Argument of "vcumsum" must be a vector')
+    elif numpy is not None :
+        dstack[-1] = numpy.cumsum(tos())
+    else:
+        dstack[-1] = vector(accumulate(tos()))
+#
+#============================
+#
+#   Higher-order words - "map", "filter", "fold" & "each" run a definition on each item of a
+#   sequence, given by its index ( "*name" ), in a loop of their own: no return to the driver
+#   nor "execidx" by item
+#   - the definition runs as its closure if closures are ON and it compiles, else with NEXT
+#     until its return, unchecked XTs failing run again checked as by the driver
+#   - "map", "filter" & "fold" check that each run leaves the one result expected
+#   - on an iterator, "map" & "filter" give an iterator running the word when an item is taken
+#
+#============================
+#
+SeqTypes = (tuple,list,dict,set,str,range)     # sequences accepted by the higher-order words
+#
+def wordrun(idx):           # function running word at idx once
+    if switchclos and closready(idx) :
+        if InClos :                 # already in a closure, abort unwound by its closentry
+            return lambda: closrun(idx)
+        return lambda: closentry(idx)
+    return lambda: runword(idx)
+#
+def seqword(name,nbargs):   # check the nbargs-2 items, sequence & word index of name on the stack ; True if ok
+    if len(dstack) < nbargs :
+        abort('"' + name + '" needs ' + str(nbargs) + ' items, stack has ' + str(len(dstack)))
+    elif not isinstance(dstack[-nbargs],SeqTypes+VecTypes+(Iterator,)) :
+        abort('Sequence of "' + name + '" must be a list, tuple, dict, set, string, range, vector or iterator')
+    elif not isinstance(tos(),int) or tos() not in range(len(ExecList)) or ExecList[tos()][CFA] is not Def :
+        abort('Index of word for "' + name + '" must be the index of a definition ( *name )')
+    else:
+        return True
+    return False
+#
+def mapiter(idx,it):        # lazy "map" of word at idx on iterator it
+    for item in it :
+        depth = len(dstack) + 1
+        dstack.append(item)
+        wordrun(idx)()              # context of the run known when the item is taken only
+        if len(dstack) != depth :
+            abort('Word of "map" must leave 1 item for each item, ( item -- x )')
+        yield dstack.pop()
+#
+def filteriter(idx,it):     # lazy "filter" of iterator it by word at idx
+    for item in it :
+        depth = len(dstack) + 1
+        dstack.append(item)
+        wordrun(idx)()
+        if len(dstack) != depth :
+            abort('Word of "filter" must leave 1 flag for each item, ( item -- flag )')
+        if dstack.pop() :
+            yield item
+#
+def k_map():                # ( seq idx -- list ) list of the results of word with index idx on each item
+    if seqword('map',2) and isinstance(nos(),Iterator) :
+        idx = dpop()
+        dpush(mapiter(idx,dpop()))
+    elif isinstance(nos(),SeqTypes+VecTypes) :
+        run = wordrun(dpop())
+        seq = dpop()
+        depth = len(dstack) + 1
+        out = []
+        try:
+            for item in seq :
+                dstack.append(item)
+                run()
+                if len(dstack) != depth :
+                    abort('Word of "map" must leave 1 item for each item, ( item -- x )')
+                out.append(dstack.pop())
+        except (ValueError,OSError) as e:   # reading the items of a file
+            abort(str(e))
+        dpush(out)
+#
+def k_filter():             # ( seq idx -- list ) list of the items for which word with index idx gives true
+    if seqword('filter',2) and isinstance(nos(),Iterator) :
+        idx = dpop()
+        dpush(filteriter(idx,dpop()))
+    elif isinstance(nos(),SeqTypes+VecTypes) :
+        run = wordrun(dpop())
+        seq = dpop()
+        depth = len(dstack) + 1
+        out = []
+        try:
+            for item in seq :
+                dstack.append(item)
+                run()
+                if len(dstack) != depth :
+                    abort('Word of "filter" must leave 1 flag for each item, ( item -- flag )')
+                if dstack.pop() :
+                    out.append(item)
+        except (ValueError,OSError) as e:   # reading the items of a file
+            abort(str(e))
+        dpush(out)
+#
+def k_fold():               # ( seq init idx -- acc ) acc = word with index idx ( acc item -- acc ) on each item
+    if seqword('fold',3) :
+        run = wordrun(dpop())
+        acc = dpop()
+        seq = dpop()
+        depth = len(dstack) + 1
+        dstack.append(acc)
+        try:
+            for item in seq :
+                dstack.append(item)
+                run()
+                if len(dstack) != depth :
+                    abort('Word of "fold" must leave 1 item for each item, ( acc item -- acc )')
+        except (ValueError,OSError) as e:   # reading the items of a file
+            abort(str(e))
+#
+def k_each():               # ( seq idx -- ... ) execute word with index idx on each item pushed
+    if seqword('each',2) :
+        run = wordrun(dpop())
+        try:
+            for item in dpop() :
+                dstack.append(item)
+                run()
+        except (ValueError,OSError) as e:   # reading the items of a file
+            abort(str(e))
+#
+#============================
+#
+#   Iterator words - an iterator gives its items one by one when taken, by "next", "ilist", "each"...
+#   so that a sequence, a file, a range is processed at constant memory, never built on the stack
+#   - iterators are Python iterators: "iter" of a file handle reads its lines as they are taken
+#   - "take", "zip", "chain", "enumerate", "map" & "filter" of iterators are iterators themselves
+#   - an iterator is used up by taking its items, "ilist" keeps them
+#
+#============================
+#
+def k_range():              # ( start stop step -- iter ) iterator over the integers from start to stop excluded
+    if len(dstack) < 3 :
+        abort('Missing arguments for "range"')
+    elif not (isinstance(dstack[-3],int) and isinstance(nos(),int) and isinstance(tos(),int)) :
+        abort('Arguments for "range" must be integers')
+    elif tos() == 0 :
+        abort('Step of "range" must not be 0')
+    else:
+        step = dpop()
+        stop = dpop()
+        dstack[-1] = iter(range(tos(),stop,step))
+#
+def k_iter():               # ( seq -- iter ) iterator over seq
+    if len(dstack) < 1 :
+        abort('Missing argument for "iter"')
+    elif isinstance(tos(),dict) :
+        dstack[-1] = iter(tos().items())
+    else:
+        try:
+            dstack[-1] = iter(tos())
+        except (TypeError,ValueError) as e:     # not iterable, or closed file
+            abort(str(e))
+#
+def k_next():               # ( iter -- iter item | iter ) ZF=1 & next item of iter, ZF=0 if iter is exhausted
+    global ZF
+    if len(dstack) < 1 :
+        abort('Missing argument for "next"')
+    elif not isinstance(tos(),Iterator) :
+        abort('Argument for "next" must be an iterator')
+    else:
+        try:
+            dpush(next(tos()))
+            ZF = 1
+        except StopIteration :
+            ZF = 0
+        except (ValueError,OSError) as e:   # reading a line or chunk of a file
+            abort(str(e))
+#
+def k_take():               # ( iter n -- iter ) iterator over the n first items of iter
+    if len(dstack) < 2 :
+        abort('Missing arguments for "take"')
+    elif not isinstance(nos(),Iterator) :
+        abort('Argument for "take" must be an iterator')
+    elif not isinstance(tos(),int) or tos() < 0 :
+        abort('Count of items for "take" must be an integer >= 0')
+    else:
+        n = dpop()
+        dstack[-1] = islice(tos(),n)
+#
+def k_commoniter(fn,name):  # ( iter1 iter2 -- iter ) iterator fn(iter1,iter2)
+    if len(dstack) < 2 :
+        abort('Missing arguments for "' + name + '"')
+    elif not (isinstance(nos(),Iterator) and isinstance(tos(),Iterator)) :
+        abort('Arguments for "' + name + '" must be iterators')
+    else:
+        it = dpop()
+        dstack[-1] = fn(tos(),it)
+#
+def k_zip():                # ( iter1 iter2 -- iter ) iterator over tuples (item1,item2), ends with the shortest
+    k_commoniter(zip,'zip')
+#
+def k_chain():              # ( iter1 iter2 -- iter ) iterator over the items of iter1, then of iter2
+    k_commoniter(chain,'chain')
+#
+def k_commondrain(fn,name): # ( iter -- x ) x = fn(items left in iter)
+    if len(dstack) < 1 :
+        abort('Missing argument for "' + name + '"')
+    elif not isinstance(tos(),Iterator) :
+        abort('Argument for "' + name + '" must be an iterator')
+    else:
+        try:
+            dstack[-1] = fn(tos())
+        except (TypeError,ValueError,OSError) as e:     # unhashable items, not (key,value) pairs, file errors
+            abort(str(e))
+#
+def k_ilist():              # ( iter -- list ) list of the items left in iter
+    k_commondrain(list,'ilist')
+#
+def k_iset():               # ( iter -- set ) set of the items left in iter
+    k_commondrain(set,'iset')
+#
+def k_idict():              # ( iter -- dict ) dictionary of the (key,value) items left in iter
+    k_commondrain(dict,'idict')
+#
+#============================
+#
 def k_dict():               # ( str -- dict ) create dictionary from string str: [item1,item2,...]
     if len(dstack) == 0 :
         abort('Missing argument for "dict"')
@@ -3629,6 +5660,22 @@ def k_open():                       # ( filename filemode -- filehandle) open fi
 #
 #===========================
 #
+def k_openbuf():                    # ( filename filemode size -- filehandle) open file with a buffer of size bytes
+    if len(dstack) < 3 :
+        abort('Missing arguments for "openbuf"')
+    elif not isinstance(tos(),int) or tos() < 0 :
+        abort('Buffer size for "openbuf" must be an integer >= 0')
+    else:
+        try:
+            dpush(open(dstack[-3],nos(),tos()))
+            k_nip()
+            k_nip()
+            k_nip()
+        except (AttributeError,ValueError,TypeError,OSError) as e:
+            abort(str(e))
+#
+#===========================
+#
 def k_read():                       # ( filehandle -- filecontent) read file 
     if len(dstack) < 1 :
         abort('Missing argument for "read"')
@@ -3678,6 +5725,34 @@ def k_readsize():                       # ( filehandle size -- sizecontent ) rea
 #
 #===========================
 #
+def k_lines():                          # ( filehandle -- iter ) iterator over the lines of file, without line breaks
+    if len(dstack) < 1 :                # lines are read through the file buffer as they are taken
+        abort('Missing argument for "lines"')
+    else:
+        try:
+            empty = tos().read(0)       # '' or b'' ; fails if file is closed or not readable
+            newline = '\n' if isinstance(empty,str) else b'\n'
+            dstack[-1] = map(operator.methodcaller('rstrip',newline),iter(tos()))
+        except (AttributeError,ValueError,TypeError,OSError) as e:
+            abort(str(e))
+#
+#===========================
+#
+def k_chunks():                         # ( filehandle size -- iter ) iterator over the pieces of size chars of file
+    if len(dstack) < 2 :                # size bytes in binary mode, the last one may be shorter
+        abort('Missing arguments for "chunks"')
+    elif not isinstance(tos(),int) or tos() <= 0 :
+        abort('Size of chunks for "chunks" must be an integer > 0')
+    else:
+        try:
+            size = dpop()
+            dstack[-1] = iter(functools.partial(tos().read,size),tos().read(0))   # up to the empty read at end
+        except (AttributeError,ValueError,TypeError,OSError) as e:
+            dpush(size)
+            abort(str(e))
+#
+#===========================
+#
 def k_seek():                       # ( filehandle offset origin -- n ) file content pointer n = origin+offset
     if len(dstack) < 3 :            # origin=0 filestart ; origin=1 current file pointer ; origin=2 file end
         abort('Missing arguments for "seek"')
@@ -3732,7 +5807,7 @@ def k_close():                       # ( filehandle -- ) close file
 def k_load():
     global CoreDef
     
-    if len(CoreDef):
+    if len(CoreDef) and Batch is None :
         wmsg=input('! Warning: all current definitions will be lost - proceed? (y/n): ')
         if wmsg == 'y' or wmsg == 'Y' :
             k_load_aux()
@@ -3752,22 +5827,282 @@ def k_load_aux():                       # ( filename -- ) load ExecList & UserDi
 #        abort('Filename must be alphanumeric')
     else:
         try:
-            f=open(tos()+'.rpp','r')
-            lload=json.load(f)
-            f.close()
-            ExecList=lload[0]
-            CoreDef=lload[1]
-            IdxRetJmp = ExecList[-1][1]
-            del ExecList[-1]
-            lastentry = ['REPL()','REPL']
-            ExecList.append(lastentry)
+            loadimage(tos()+'.rpp')
             print('  Definitions loaded:')
             for i,value in enumerate(CoreDef):
                 print('   ',i,value)
             k_drop()
-            REPL()
-        except (AttributeError,ValueError,TypeError,OSError) as e:
+            raise Restart               # old ExecList gone, back to REPL
+        except (AttributeError,ValueError,TypeError,OSError,NameError,EOFError) as e:
             abort(str(e))
+#============================
+def loadstate(lload):               # install [ExecList,CoreDef,InlineList] as saved in JSON by older versions or a transpiled module
+    xl = lload[0]
+    installstate(CodeList(xl[:-1]),lload[1],lload[2] if len(lload) > 2 else [],xl[-1][1])
+                                    # XT names back to function references ; files saved before
+                                    # inlining have no InlineList, last entry is ['IdxR',IdxRetJmp]
+#
+def installstate(code,coredef,inlines,idxretjmp,effects=None):   # make code the ExecList, with its CoreDef & InlineList
+    global ExecList, CoreDef, IdxRetJmp, InlineList
+    ExecList = code
+    CoreDef = coredef
+    InlineList = inlines
+    IdxRetJmp = idxretjmp
+    closreset()                     # closures compiled from the old ExecList
+    Required.clear()
+    if effects is None :
+        StackEffects.clear()
+        stackverify(0)
+    else:                           # verified by the same version of RPPy
+        stackrestore(effects)
+    lastentry = [REPL,'REPL']
+    ExecList.append(lastentry)
+#
+#===========================
+#
+#   Image files - "save" writes ExecList, CoreDef & InlineList to filename.rpp as a binary
+#   image, read back by "load" & "-t" through mmap
+#   - header: magic "RPPY", image version, version of RPPy, nb. of entries, crc32 of the rest
+#   - opcodes of ExecList as an array of 2 bytes little endian, copied as is, then the table
+#     of XT names by opcode: only the opcodes used are resolved at load, not every entry
+#   - then by marshal the index: table of XT names, CoreDef, InlineList, IdxRetJmp,
+#     StackEffects, and where the PFAs of each definition start in ExecList & in the file;
+#     the PFAs follow, one piece by definition, so that a library reads only the ones of the
+#     definitions it needs
+#   - marshal keeps the type of tuples, sets, complex numbers, bytes; JSON turned them to lists
+#     or failed
+#   - the stack effects are used at load only if saved by the same version of RPPy, else the
+#     definitions are verified again
+#   - files saved in JSON by older versions are still loaded
+#
+#   Journal - "journal", "s." & Ctrl-S append to filename.rpj only what changed since the image
+#   or the last journal record: entries from ExecList.saved on, entries patched before it,
+#   mutable literals ( variables holding lists, dicts ... ), CoreDef, InlineList & StackEffects
+#   differences; "load" replays the records after the image
+#   - header: magic "RPJL", journal version, version of RPPy, crc32 of the image it follows
+#   - records: length & crc32, then the changes by marshal; a record damaged by a crash while
+#     appending it is ignored with the ones after it
+#   - written as a new image instead ( journal compacted & deleted ) if the image is not the
+#     one of the last save or load, or if the journal would grow bigger than the image
+#
+#===========================
+#
+ImageMagic = b'RPPY'
+ImageVersion = 2
+ImageHead = struct.Struct('<4sHBBII')   # magic, version, RPPy veryy & vermm, nb. of entries, crc32 of the rest
+IndexHead = struct.Struct('<I')         # length of the index
+JournalMagic = b'RPJL'
+JournalVersion = 1
+JournalHead = struct.Struct('<4sHBBI')  # magic, version, RPPy veryy & vermm, crc32 of its image
+RecordHead = struct.Struct('<II')       # length & crc32 of a record
+MutableTypes = (list,dict,set,bytearray)    # literals of doLit which may be modified in place
+#
+JournalName = None      # image of the last save or load, journal appended to it
+JournalCrc = 0          # crc32 of this image
+JournalBase = 0         # size of this image
+JournalSize = 0         # size of its journal, -1 if not to be appended ( written by an other version )
+JournalDefs = {}        # CoreDef, StackEffects & InlineList at the last save or load
+JournalEffects = {}
+JournalInlines = []
+#
+def journalname(fname):             # journal of image file fname
+    return os.path.splitext(fname)[0] + '.rpj'
+#
+def imagebytes(ops):                # opcodes as bytes, little endian
+    ops = array('H',ops)
+    if sys.byteorder == 'big' :
+        ops.byteswap()
+    return ops.tobytes()
+#
+def imageops(names,buf,table=None):     # opcodes from bytes buf, translated from XT names by opcode ;
+    ops = array('H')                    # table of opcodes translated, if given, kept for next calls
+    ops.frombytes(buf)
+    if sys.byteorder == 'big' :
+        ops.byteswap()
+    if table is None :
+        table = {}                      # opcode in file -> opcode here
+    for op in set(ops).difference(table) :
+        table[op] = xtcode(getxt(names[op]))
+    if any(new != op for op,new in table.items()) :
+        ops = array('H',map(table.__getitem__,ops))
+    return ops
+#
+def checkpoint(fname,crc,jsize):    # state saved to/loaded from image fname, journal of jsize bytes
+    global JournalName,JournalCrc,JournalBase,JournalSize,JournalDefs,JournalEffects,JournalInlines
+    JournalName = fname
+    JournalCrc = crc
+    JournalBase = os.path.getsize(fname)
+    JournalSize = jsize
+    ExecList.saved = len(ExecList)
+    ExecList.patched = set()
+    JournalDefs = {name: list(val) for name,val in CoreDef.items()}
+    JournalEffects = dict(StackEffects)
+    JournalInlines = [list(rec) for rec in InlineList]
+#
+def imageindex(mv,nb):              # index of image in mv, of nb entries, + position of the PFAs
+    pos = ImageHead.size + 2*nb
+    size, = IndexHead.unpack_from(mv,pos)
+    pos += IndexHead.size
+    return marshal.loads(mv[pos:pos+size]) + [pos+size]
+#
+def imageargs(mv,base,offsets,first,last):  # PFAs of the pieces first to last-1, read from position base
+    args = []
+    for i in range(first,last) :
+        args.extend(marshal.loads(mv[base+offsets[i]:base+offsets[i+1]]))
+    return args
+#
+def saveimage(fname):               # write ExecList, CoreDef & InlineList to image file fname
+    vecunsaved(ExecList.args)
+    ops = imagebytes(ExecList.ops)
+    names = [xtname(GuardXTs.get(xt,xt)) for xt in XTList]  # unchecked XTs saved as checked ones
+    ExecList.headers()
+    starts = [0] + [idx for idx in ExecList.defpos if idx > 0]  # a piece of PFAs by definition
+    pieces = [marshal.dumps(ExecList.args[a:b]) for a,b in zip(starts,starts[1:]+[len(ExecList)])]
+    offsets = [0]
+    for piece in pieces :
+        offsets.append(offsets[-1]+len(piece))
+    index = marshal.dumps([names,CoreDef,InlineList,IdxRetJmp,StackEffects,starts,offsets])
+    pieces = b''.join(pieces)
+    size = IndexHead.pack(len(index))
+    crc = zlib.crc32(pieces,zlib.crc32(index,zlib.crc32(size,zlib.crc32(ops))))
+    with open(fname,'wb') as f :
+        f.write(ImageHead.pack(ImageMagic,ImageVersion,veryy,vermm,len(ExecList),crc))
+        f.write(ops)
+        f.write(size)
+        f.write(index)
+        f.write(pieces)
+    if os.path.exists(journalname(fname)) :    # changes it held are in the image now
+        os.remove(journalname(fname))
+    checkpoint(fname,crc,0)
+#
+def journalrecord():                # changes since the last save or load, as bytes
+    keep = ExecList.saved
+    patches = {idx: [ExecList.ops[idx],ExecList.args[idx]] for idx in ExecList.patched if idx < keep}
+    oplit = xtcode(doLit)
+    for idx in compress(range(keep),map(oplit.__eq__,ExecList.ops[:keep])) :
+        if type(ExecList.args[idx]) in MutableTypes :
+            patches[idx] = [oplit,ExecList.args[idx]]
+    tail = ExecList.ops[keep:]
+    used = set(tail).union(op for op,arg in patches.values())
+    names = {op: xtname(GuardXTs.get(XTList[op],XTList[op])) for op in used}  # only the opcodes written
+    kept = [name for name in JournalDefs if name in CoreDef]
+    full = list(CoreDef)[:len(kept)] != kept    # order changed: "deldef" then defined again
+    defs = {name: val for name,val in CoreDef.items() if full or JournalDefs.get(name,None) != val}
+    dels = [name for name in JournalDefs if name not in CoreDef]
+    effs = {idx: eff for idx,eff in StackEffects.items() if idx not in JournalEffects or JournalEffects[idx] != eff}
+    effdels = [idx for idx in JournalEffects if idx not in StackEffects]
+    inl = len(JournalInlines) if InlineList[:len(JournalInlines)] == JournalInlines else 0
+    vecunsaved([ExecList.args[keep:],patches])
+    return marshal.dumps([keep,names,imagebytes(tail),ExecList.args[keep:],patches,
+                          full,defs,dels,effs,effdels,inl,InlineList[inl:],IdxRetJmp])
+#
+def journalsave(fname):             # save to image fname, only the changes appended to its journal if possible ;
+                                    # return the file written
+    jname = journalname(fname)
+    size = os.path.getsize(jname) if os.path.exists(jname) else 0
+    if fname != JournalName or size != JournalSize or not os.path.exists(fname) :
+        saveimage(fname)            # other image, or files changed since
+        return fname
+    rec = journalrecord()
+    if size + RecordHead.size + len(rec) > JournalBase :
+        saveimage(fname)            # journal compacted into a new image
+        return fname
+    with open(jname,'ab') as f :
+        if size == 0 :
+            f.write(JournalHead.pack(JournalMagic,JournalVersion,veryy,vermm,JournalCrc))
+        f.write(RecordHead.pack(len(rec),zlib.crc32(rec)))
+        f.write(rec)
+    checkpoint(fname,JournalCrc,os.path.getsize(jname))
+    return jname
+#
+def journalreplay(fname,crc,state):     # apply records of journal of image fname ( crc ) to state
+                                        # [ops,args,coredef,inlines,idxretjmp,effects] ; return journal size
+    jname = journalname(fname)
+    if not os.path.exists(jname) :
+        return 0
+    with open(jname,'rb') as f :
+        data = f.read()
+    if len(data) < JournalHead.size :
+        print('  Journal',jname,'damaged, ignored')
+        return -1
+    magic,version,savedyy,savedmm,base = JournalHead.unpack_from(data)
+    if magic != JournalMagic or version > JournalVersion or base != crc :
+        print('  Journal',jname,'not made for',fname+', ignored')
+        return -1
+    ops,args,coredef,inlines,idxretjmp,effects = state
+    pos = JournalHead.size
+    nbrec = 0
+    while pos < len(data) :
+        if pos + RecordHead.size > len(data) :
+            break
+        length,reccrc = RecordHead.unpack_from(data,pos)
+        rec = data[pos+RecordHead.size:pos+RecordHead.size+length]
+        if len(rec) != length or zlib.crc32(rec) != reccrc :
+            break
+        keep,names,opsbuf,tail,patches,full,defs,dels,effs,effdels,inl,inltail,idxretjmp = marshal.loads(rec)
+        del ops[keep:]
+        del args[keep:]
+        ops.extend(imageops(names,opsbuf))
+        args.extend(tail)
+        for idx,(op,arg) in patches.items() :
+            ops[idx] = xtcode(getxt(names[op]))
+            args[idx] = arg
+        if full :
+            coredef.clear()
+        for name in dels :
+            coredef.pop(name,None)
+        coredef.update(defs)
+        if effects is not None :
+            for idx in effdels :
+                effects.pop(idx,None)
+            effects.update(effs)
+        del inlines[inl:]
+        inlines.extend(inltail)
+        pos += RecordHead.size + length
+        nbrec += 1
+    state[4] = idxretjmp
+    if (savedyy,savedmm) != (veryy,vermm) :
+        state[5] = None             # kernel words may have changed
+    if pos < len(data) :
+        print('  Journal',jname,'damaged,',nbrec,'records replayed')
+        return -1
+    if state[5] is None :
+        return -1                   # not appended by this version, next save writes an image
+    return len(data)
+#
+def loadimage(fname):               # install ExecList, CoreDef & InlineList from image or JSON file fname
+    global JournalName
+    with open(fname,'rb') as f :
+        if f.read(len(ImageMagic)) != ImageMagic :     # saved in JSON
+            f.seek(0)
+            loadstate(json.load(f))
+            JournalName = None      # no journal on JSON files
+            return
+        with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm :
+            if len(mm) < ImageHead.size :
+                raise ValueError('image file '+fname+' damaged')
+            magic,version,savedyy,savedmm,nb,crc = ImageHead.unpack_from(mm)
+            if version != ImageVersion :
+                raise ValueError('image file '+fname+' saved by a newer version of RPPy')
+            with memoryview(mm) as mv :     # slices read in place, not copied
+                if zlib.crc32(mv[ImageHead.size:]) != crc :
+                    raise ValueError('image file '+fname+' damaged, checksum error')
+                opsbuf = mv[ImageHead.size:ImageHead.size+2*nb].tobytes()
+                names,coredef,inlines,idxretjmp,effects,starts,offsets,base = imageindex(mv,nb)
+                args = imageargs(mv,base,offsets,0,len(starts))
+    ops = imageops(names,opsbuf)
+    if (savedyy,savedmm) != (veryy,vermm) :     # kernel words may have changed
+        effects = None
+    state = [ops,args,coredef,inlines,idxretjmp,effects]
+    jsize = journalreplay(fname,crc,state)
+    ops,args,coredef,inlines,idxretjmp,effects = state
+    code = CodeList()
+    code.ops = ops
+    code.args = args
+    installstate(code,coredef,inlines,idxretjmp,effects)
+    ExecList.truncate(len(ExecList)-1)  # state as saved, without the REPL entry appended
+    checkpoint(fname,crc,jsize if effects is not None or jsize <= 0 else -1)
+    ExecList.append([REPL,'REPL'])
 #
 #===========================
 #
@@ -3781,18 +6116,10 @@ def k_save():                       # ( filename -- ) save ExecList & UserDict
 #        abort('Filename must be alphanumeric')
     else:
         if len(CoreDef) :
-            lsave=[]
-            lastret = ['IdxR',IdxRetJmp]
-            ExecList.append(lastret)
-            lsave.append(ExecList)
-            lsave.append(CoreDef)
             try:
-                f=open(tos()+'.rpp','w')
-                json.dump(lsave,f)
-                f.close()
+                saveimage(tos()+'.rpp')
                 IndSave = len(CoreDef)
                 print('Saved:',IndSave,'definitions to '+dpop()+'.rpp')
-                del ExecList[-1]
             except (AttributeError,ValueError,TypeError,OSError) as e:
                 abort(str(e))
         else:
@@ -3803,18 +6130,10 @@ def k_save():                       # ( filename -- ) save ExecList & UserDict
 def k_sdot():                       # ( -- ) save ExecList & UserDict to file "tempsave.rpp" ; substitute for Ctrl-S
     global IndSave, IdxRetJmp
     if len(CoreDef) :               # save only if there are already definitions made
-        lsave=[]
-        lastret = ['IdxR',IdxRetJmp]
-        ExecList.append(lastret)
-        lsave.append(ExecList)
-        lsave.append(CoreDef)
-        try:
-            f=open('tempsave.rpp','w')
-            json.dump(lsave,f)
-            f.close()
+        try:
+            fname = journalsave('tempsave.rpp')
             IndSave = len(CoreDef)
-            print('Saved:',IndSave,'definitions to tempsave.rpp')
-            del ExecList[-1]
+            print('Saved:',IndSave,'definitions to',fname)
         except (AttributeError,ValueError,TypeError,OSError) as e:
             abort(str(e))
     else:
@@ -3822,6 +6141,340 @@ def k_sdot():                       # ( -- ) save ExecList & UserDict to file "t
 #
 #===========================
 #
+def k_journal():                    # ( filename -- ) save ExecList & UserDict, only the changes since the last
+    global IndSave                  # save or load of filename.rpp appended to filename.rpj
+    if len(dstack) < 1 :
+        abort('Missing argument for "journal"')
+    elif not isinstance(tos(),str):
+        abort('Filename must be of type string')
+    else:
+        if len(CoreDef) :
+            try:
+                fname = journalsave(tos()+'.rpp')
+                dpop()
+                IndSave = len(CoreDef)
+                print('Saved:',IndSave,'definitions to',fname)
+            except (AttributeError,ValueError,TypeError,OSError) as e:
+                abort(str(e))
+        else:
+            print('No definitions to save')
+#
+#===========================
+#
+#   Libraries - "library" reads only the index of an image saved by "save": the names of its
+#   definitions are then known to the compiler, but nothing is loaded
+#   - the first time a library word is compiled into a call ( or "*name" ), its definition &
+#     the ones it calls, jumps to, pushes by "*name" or inlined are read from the file,
+#     relocated & inserted at IdxRetJmp, before the definitions of the current compile cycle
+#   - definitions already loaded and still in CoreDef under their name are not read again
+#   - the names of the library come after CoreDef: a definition of the same name wins
+#   - the definitions loaded are verified again, then saved with the user's ones
+#   - "require" appends at once all the words of a library not defined yet, the ones it uses of
+#     the same name as a definition of CoreDef linked to it; so modules saved apart, sharing
+#     base words, are combined without duplicates. A library already appended is skipped
+#   - IP & return stack relocated too, "require" may run inside a definition
+#
+#===========================
+#
+LibIndex = {}       # name -> Library holding its definition, for names not loaded yet
+#
+class Library:              # image file opened by "library", read only on demand
+    def __init__(self,fname):
+        with open(fname,'rb') as f :
+            self.mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        if len(self.mm) < ImageHead.size or self.mm[:len(ImageMagic)] != ImageMagic :
+            raise ValueError('library '+fname+' is not an image file')
+        magic,version,savedyy,savedmm,nb,crc = ImageHead.unpack_from(self.mm)
+        if version != ImageVersion :
+            raise ValueError('library '+fname+' saved by an other version of RPPy, load & save it again')
+        if zlib.crc32(self.mm[ImageHead.size:]) != crc :
+            raise ValueError('image file '+fname+' damaged, checksum error')
+        if os.path.exists(journalname(fname)) :
+            raise ValueError('library '+fname+' has a journal, load & save it first')
+        self.nb = nb
+        self.names,self.coredef,inlines,self.idxretjmp,effects,self.starts,self.offsets,self.base = imageindex(self.mm,nb)
+        self.effects = effects if (savedyy,savedmm) == (veryy,vermm) else None  # else verified again
+        self.inlines = {}   # index of Def in library -> inlined copies in its body
+        for rec in inlines :
+            self.inlines.setdefault(self.starts[bisect.bisect_right(self.starts,rec[0])-1],[]).append(rec)
+        self.table = {}     # opcode in file -> opcode here, of the bodies read
+        self.loaded = {}    # index of Def in library -> [its CoreDef entry, name], once loaded
+        self.crc = crc
+        self.defnames = {val[0]: name for name,val in self.coredef.items()}   # index of Def -> name
+    def body(self,idx):     # ops & PFAs of def at idx of the library
+        i = bisect.bisect_right(self.starts,idx) - 1
+        stop = min(self.starts[i+1] if i+1 < len(self.starts) else self.nb,self.idxretjmp)
+        ops = imageops(self.names,self.mm[ImageHead.size+2*idx:ImageHead.size+2*stop],self.table)
+        return ops,imageargs(self.mm,self.base,self.offsets,i,i+1)[:stop-idx]
+    def resident(self,idx,linked=False):    # index in ExecList of def at idx of the library if loaded, or if
+                                            # linked of the def of same name in CoreDef ; else None
+        entry = self.loaded.get(idx,None)
+        if entry is not None and CoreDef.get(entry[1],None) is entry[0] :
+            return entry[0][0]
+        if linked and self.defnames.get(idx,None) in CoreDef :
+            return CoreDef[self.defnames[idx]][0]
+        return None             # not loaded, or since redefined, deleted, or other ExecList loaded
+#
+def libload(name):          # CoreDef entry of library word name, loaded with its callees ; None if none
+    lib = LibIndex.get(name,None)
+    if lib is None or name not in lib.coredef :
+        return None
+    libappend(lib,[lib.coredef[name][0]])
+    return CoreDef.get(name,None)
+#
+def libappend(lib,roots,linked=False):  # load defs at indexes roots of library lib & their callees, callees
+                                        # of same name as a def in CoreDef linked to it if linked ;
+                                        # return nb. of defs loaded
+    branchops = {xtcode(xt) for xt in BranchXTs}
+    refops = {xtcode(xt) for xt in (doCall,doJmp,doLitx)}
+    bodies = {}             # index of Def in library -> [ops,PFAs]
+    todo = list(roots)
+    while todo :
+        idx = todo.pop()
+        if idx in bodies or lib.resident(idx,linked) is not None :
+            continue
+        ops,args = lib.body(idx)
+        bodies[idx] = [ops,args]
+        todo.extend(compress(args,map(refops.__contains__,ops)))
+        todo.extend(rec[2] for rec in lib.inlines.get(idx,[]))
+    pos = IdxRetJmp
+    newpos = {}             # index of Def in library -> index in ExecList
+    ops = array('H')
+    args = []
+    for idx in sorted(bodies) :
+        newpos[idx] = pos + len(ops)
+        ops.extend(bodies[idx][0])
+        args.extend(bodies[idx][1])
+    def reloc(idx):         # index in ExecList of def at idx of the library
+        return newpos[idx] if idx in newpos else lib.resident(idx,linked)
+    libpos = {new: idx for idx,new in newpos.items()}  # index in ExecList -> index of Def in library
+    starts = sorted(libpos)
+    for i in compress(range(len(ops)),map(branchops.union(refops).__contains__,ops)) :
+        if ops[i] in refops :
+            args[i] = reloc(args[i])
+        else:               # inside its definition, moved as a whole
+            start = starts[bisect.bisect_right(starts,pos+i)-1]
+            args[i] += start - libpos[start]
+    insertcode(pos,ops,args)
+    for idx in sorted(bodies) :
+        InlineList.extend([rec[0]+newpos[idx]-idx,rec[1]+newpos[idx]-idx,reloc(rec[2])]
+                          for rec in lib.inlines.get(idx,[]))
+        word = args[newpos[idx]-pos]
+        if lib.coredef.get(word,[None])[0] == idx and word not in CoreDef :
+            CoreDef[word] = [newpos[idx],lib.coredef[word][1]]
+            lib.loaded[idx] = [CoreDef[word],word]
+    table = fasttable()
+    for idx in sorted(bodies) :     # callees first, usually defined before
+        start = newpos[idx]
+        if lib.effects is None or idx not in lib.effects :
+            stackfast(start)
+            continue
+        StackEffects[start] = lib.effects[idx]
+        if lib.effects[idx] is not None :
+            stop = start + len(bodies[idx][0])
+            ExecList.ops[start+1:stop] = array('H',map(table.__getitem__,ExecList.ops[start+1:stop]))
+    return len(bodies)
+#
+def k_library():                    # ( filename -- ) make the words of filename.rpp known, loaded when used
+    if len(dstack) < 1 :
+        abort('Missing argument for "library"')
+    elif not isinstance(tos(),str):
+        abort('Filename must be of type string')
+    else:
+        try:
+            lib = Library(tos()+'.rpp')
+            for name in lib.coredef :
+                LibIndex[name] = lib
+            print('  Library words indexed:',len(lib.coredef))
+            dpop()
+        except (ValueError,OSError,EOFError) as e:
+            abort(str(e))
+#
+Required = set()    # crc32 of the libraries appended by "require" to this ExecList
+#
+def k_require():                    # ( filename -- ) append the words of filename.rpp not defined yet
+    if len(dstack) < 1 :
+        abort('Missing argument for "require"')
+    elif not isinstance(tos(),str):
+        abort('Filename must be of type string')
+    else:
+        try:
+            lib = Library(tos()+'.rpp')
+        except (ValueError,OSError,EOFError) as e:
+            abort(str(e))
+            return
+        fname = dpop()+'.rpp'
+        if lib.crc in Required :
+            print('  Library already loaded:',fname)
+            return
+        roots = [val[0] for name,val in lib.coredef.items() if name not in CoreDef]
+        nb = len(CoreDef)
+        if roots :
+            libappend(lib,roots,True)
+        Required.add(lib.crc)
+        print('  Library words linked:',len(CoreDef)-nb,'; already defined:',len(lib.coredef)-len(roots))
+#
+#===========================
+#
+#   Transpiler - ahead-of-time translation of definitions to a python module
+#   - every definition reached from CoreDef becomes a python function _w<index>, calling
+#     the kernel functions directly: "if/ifz/ifneq ... then" become if statements,
+#     a tail jump to the word itself a loop, a tail jump to another word is returned
+#     to the caller and looped there, so tail recursion doesn't fill the python stack
+#   - definitions using XTs which change IP (execidx, choose, iloop, ...) run with NEXT,
+#     as recursive ones calling themselves back not in tail position
+#   - the module holds a copy of ExecList & CoreDef, installed in the VM at import,
+#     as variables, "*name" indexes and NEXT-run words need them
+#
+#===========================
+#
+def transpile(fname):               # write all definitions to python module fname.py ; return nb. of words
+    imports = {'dpush'}
+    funcs = []
+    done = {}               # definitions reached, in order, as keys
+    scans = {}
+    todo = [defval[0] for defval in CoreDef.values()]
+    while todo :
+        idx = todo.pop()
+        if idx in done :
+            continue
+        done[idx] = None
+        sc = closscan(idx)
+        if sc is not None :
+            scans[idx] = sc
+            todo.extend(sc[1])
+    recursive = closrecursive(scans)
+    for idx in done :
+        sc = scans.get(idx,None)
+        if sc is None or idx in recursive : # not compilable, or recursion would nest python calls:
+            funcs.append('def _w'+str(idx)+'():'+(' '*8)+'# '+str(ExecList[idx][PFA]))
+            funcs.append('    vm.runword('+str(idx)+')')  # leave it to NEXT
+            funcs.append('')
+            continue
+        body = transpile_block(idx,idx+1,sc[0],2,imports)
+        funcs.append('def _w'+str(idx)+'():'+(' '*8)+'# '+str(ExecList[idx][PFA]))
+        if 'continue' in [line.strip() for line in body] :   # tail jump to itself
+            funcs.append('    while True :')
+            funcs.extend(body)
+        else:
+            funcs.extend([line[4:] for line in body])
+        funcs.append('')
+    lsavexl = exportexeclist()
+    lsavexl.append(['IdxR',IdxRetJmp])
+    for entry in lsavexl :
+        ast.literal_eval(repr(entry[PFA]))  # ValueError if literal can't be written as python source
+    lines = ['#!/usr/bin/env python3',
+             '#',
+             '# RPPy definitions transpiled by "transpile" - generated file, do not edit',
+             '#   import it to run the words without the REPL, as python functions',
+             '#   working on the data stack of the RPPy VM:',
+             '#       import '+fname.split('/')[-1]+' as lib ; lib.vm.dpush(5) ; lib.fact() ; print(lib.vm.dstack)',
+             '#   words with names not valid in python are found in WORDS: lib.WORDS["2x"]()',
+             '#',
+             'import rppy as vm',
+             'from rppy import ' + ','.join(sorted(imports)),
+             '',
+             'EXECLIST = [',
+             ',\n'.join(['    '+repr(entry) for entry in lsavexl]),
+             '    ]',
+             'COREDEF = ' + repr(CoreDef),
+             'INLINES = ' + repr(InlineList),
+             '',
+             'def _ifneq():               # condition of "ifneq"',
+             '    try:',
+             '        return vm.tos() != vm.nos()',
+             '    except(TypeError,ValueError) as e:',
+             '        vm.abort(str(e))',
+             '',
+             'def _word(fn):              # run word fn, looping its tail jumps',
+             '    def word():',
+             '        f = fn()',
+             '        while f :',
+             '            f = f()',
+             '    return word',
+             '']
+    lines.extend(funcs)
+    lines.append('WORDS = {')
+    for name,defval in CoreDef.items() :
+        lines.append('    '+repr(name)+': _word(_w'+str(defval[0])+'),')
+    lines.append('    }')
+    lines.append('')
+    for name,defval in CoreDef.items() :    # python names for words, if valid & not already used
+        if name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_') \
+            and name not in imports and name not in ('vm','WORDS','EXECLIST','COREDEF','INLINES') :
+            lines.append(name+' = WORDS['+repr(name)+']')
+    lines.append('')
+    lines.append('vm.loadstate([[list(entry) for entry in EXECLIST],dict(COREDEF),[list(rec) for rec in INLINES]])')
+    lines.append('')
+    f=open(fname+'.py','w')
+    f.write('\n'.join(lines))
+    f.close()
+    return len(done)
+#============================
+def transpile_block(idxdef,start,stop,ind,imports):   # python source of ExecList[start:stop]
+    lines = []
+    tab = '    '*ind
+    idx = start
+    while idx < stop :
+        xt = ExecList[idx][CFA]
+        pfa = ExecList[idx][PFA]
+        if xt is doIf or xt is doIfnot or xt is doIfneq :
+            if xt is doIf :
+                lines.append(tab+'if vm.ZF :')
+            elif xt is doIfnot :
+                lines.append(tab+'if not vm.ZF :')
+            else:
+                lines.append(tab+'if _ifneq() :')
+            block = transpile_block(idxdef,idx+1,pfa+1,ind+1,imports)
+            lines.extend(block if block else [tab+'    pass'])
+            idx = pfa + 1           # continue after "then"
+            continue
+        elif xt is doLit and idx == idxdef+1 :  # maybe a variable, read at execution
+            lines.append(tab+'dpush(vm.ExecList['+str(idx)+'][1])')
+        elif xt is doLit or xt is doLitx :
+            lines.append(tab+'dpush('+repr(pfa)+')')
+        elif xt is doLitOp :
+            imports.add('litop')
+            lines.append(tab+'litop('+repr(pfa)+')')
+        elif xt is doCall :
+            lines.append(tab+'f = _w'+str(pfa)+'()')
+            lines.append(tab+'while f :')
+            lines.append(tab+'    f = f()')
+        elif xt is doJmp and pfa == idxdef :
+            lines.append(tab+'continue')
+        elif xt is doJmp :
+            lines.append(tab+'return _w'+str(pfa))
+        elif xt is doRet :
+            lines.append(tab+'return')
+        elif xt is not k_pass :
+            name = xtname(GuardXTs.get(xt,xt))
+            if '.' in name :        # XT from another module, as h.k_help()
+                lines.append(tab+'vm.'+name)
+            else:
+                imports.add(name.removesuffix('()'))
+                lines.append(tab+name)
+        idx += 1
+    return lines
+#
+#===========================
+#
+def k_transpile():                  # ( filename -- ) transpile all definitions to python module filename.py
+    if len(dstack) < 1 :
+        abort('Missing argument for "transpile"')
+    elif not isinstance(tos(),str):
+        abort('Filename must be of type string')
+    else:
+        if len(CoreDef) :
+            try:
+                nbwords = transpile(tos())
+                print('Transpiled:',nbwords,'words to '+dpop()+'.py')
+            except (AttributeError,ValueError,TypeError,SyntaxError,OSError) as e:
+                abort(str(e))
+        else:
+            print('No definitions to transpile')
+#
+#===========================
+#
 def k_jsdump():                     # ( filename pyobj -- ) write Python object as JSON object to filename
     if len(dstack) < 2 :
         abort('Missing arguments for "jsdump"')
@@ -3967,6 +6620,44 @@ def k_choose():              # ( idx1 idx2 -- ) if ZF=1 execute idx1, else idx2
 #
 #===========================
 #
+def k_closon():             # ( -- ) switch closure compiled execution of definitions to ON
+    global switchclos
+    switchclos = 1
+#
+#===========================
+#
+def k_closoff():            # ( -- ) switch closure compiled execution of definitions to OFF
+    global switchclos
+    switchclos = 0
+#
+#===========================
+#
+def k_regon():              # ( -- ) switch closures ON, with top of stack kept in a register
+    global switchclos,switchreg
+    switchclos = 1
+    switchreg = 1
+    closreset()             # closures compiled again with register runs
+#
+#===========================
+#
+def k_regoff():             # ( -- ) switch top of stack register OFF
+    global switchreg
+    switchreg = 0
+    closreset()
+#
+#===========================
+#
+def k_inlinemax():          # ( n -- ) inline definitions up to n entries at call sites
+    global InlineMax
+    if len(dstack) < 1 :
+        abort('Missing argument for "inlinemax"')
+    elif not isinstance(tos(),int) or tos() < 0 :
+        abort('Argument for "inlinemax" must be a positive integer')
+    else:
+        InlineMax = dpop()
+#
+#===========================
+#
 def k_deldef():             # ( defname -- ) delete definition defname from high level defs dictionary
     if len(dstack) < 1 :
         abort('Missing argument for "deldef"')
@@ -3988,7 +6679,8 @@ def k_dellast():             # ( -- ) delete last definition ; shorten ExecList
         tkname = CoreDef.popitem()
         print('"'+tkname[0]+'" at index',tkname[1][0],'deleted')
         del ExecList[tkname[1][0]:]
-        ExecList.append(['REPL()','REPL'])
+        inlineprune(tkname[1][0])
+        ExecList.append([REPL,'REPL'])
         IP = len(ExecList) - 2
     else:
         print('CoreDef empty, no definition to delete')
@@ -4014,8 +6706,10 @@ def k_edit():                 # ( defname -- ) edit definition defname
 #===========================
 #  
 def k_enumerate():          # ( seq -- list ) create a list of tuples of the form (count,value)
-    if len(dstack) < 1 :
+    if len(dstack) < 1 :    # an iterator of them if seq is an iterator
         abort('Missing argument for "enumerate"')
+    elif isinstance(tos(),Iterator) :
+        dstack[-1] = enumerate(tos())
     else:
         try:
             dpush(list(enumerate(tos())))
@@ -4167,6 +6861,8 @@ def k_ord():                # ( strchr -- n ) convert string representing one ch
 #
 def k_quit():
     global IndSave
+    if Batch is not None :      # end of script, no questions
+        batchexit(0)
     if IndSave == len(CoreDef) and len(CoreDef) != 0 :
         print('RPPy ended; last saved:',IndSave,'definitions')
         exit (0)
@@ -4177,7 +6873,7 @@ def k_quit():
             print('RPPy ended;',len(CoreDef)-IndSave,'definitions not saved')
             exit(0)
         else:
-            REPL()
+            raise Restart
     else:
         if len(CoreDef):
             s = input('! Warning: quit without save; proceed anyway? (y/n):')
@@ -4185,7 +6881,7 @@ def k_quit():
                 print('RPPy ended;',len(CoreDef),'definitions not saved')
                 exit (0)
             else:
-                REPL()
+                raise Restart
         else:
             print('RPPy ended; no definitions to save')
             exit (0)
@@ -4201,19 +6897,16 @@ def k_refdef():             # ( defname -- list ) list of all definitions includ
     else:
         defval = CoreDef.get(tos(),None)
         if defval :
-            idx = 1
-            reflst = []
             idxlastretjmp = len(ExecList)-1
-            while ExecList[idxlastretjmp][CFA] != 'doRet()' and ExecList[idxlastretjmp][CFA] != 'doJmp()' :
+            while ExecList[idxlastretjmp][CFA] != doRet and ExecList[idxlastretjmp][CFA] != doJmp :
                 idxlastretjmp -= 1
-            while idx < idxlastretjmp -1 :
-                if ExecList[idx][CFA] == 'Def()' :
-                    defname = ExecList[idx][PFA]
-                    idx += 1
-                if ExecList[idx][CFA] == 'doCall()' or ExecList[idx][CFA] == 'doJmp()' or ExecList[idx][CFA] == 'doLitx()' :
-                    if ExecList[idx][PFA] == defval[0] :
-                        reflst.append(defname)
-                idx += 1
+            refs = [rec[0] for rec in InlineList if rec[2] == defval[0]]    # inlined copies
+            refs.extend(ExecList.references().get(defval[0],[]))
+            reflst = []
+            for idx in sorted(refs) :   # in definitions only, not in execution strings
+                idxdef = ExecList.defat(idx)
+                if idxdef is not None and idx <= idxlastretjmp :
+                    reflst.append(ExecList[idxdef][PFA])
             k_drop()
             dpush(reflst)
         else:
@@ -4232,7 +6925,8 @@ def k_repdef():             # ( defname -- ) replace old definitions of defname
         if not defval :
             abort('Name "'+tos()+'" undefined')
         else:
-            nbrepl = ExecList.count(['Def()',tos()])
+            heads = ExecList.headers().get(tos(),[])
+            nbrepl = len(heads)
             if nbrepl == 1 :
                 print('  No old definitions to replace')
                 k_drop()
@@ -4240,32 +6934,55 @@ def k_repdef():             # ( defname -- ) replace old definitions of defname
             else:
                 print('  Replacing',nbrepl-1,'older definitions')
                 nbrepleff = 0
-                idxdef = ExecList.index(['Def()',tos()])
-                idx = idxdef+1
-                while idx < defval[0] :
-                    if ExecList[idx][CFA] == 'doCall()' or ExecList[idx][CFA] == 'doJmp()' or ExecList[idx][CFA] == 'doLitx()' :
-                        if ExecList[idx][PFA] == idxdef :
-                            ExecList[idx][PFA] = defval[0]
-                            nbrepleff += 1
-                        else:
-                            if ExecList[idx][PFA] > idx :
-                                idxforward = ExecList[idx][PFA]
-                                if ExecList[idxforward] == ['Def()',tos()] :
-                                    ExecList[idx][PFA] = defval[0]
-                                    nbrepleff += 1
-                        idx += 1
-                        continue                  
-                    elif ExecList[idx] == ['Def()',tos()] :
-                        idxdef = idx
-                        idx = idxdef+1
-                        continue
-                    else:
-                        idx += 1
+                refs = ExecList.references()
+                sites = [idx for idxdef in heads if idxdef != defval[0]
+                         for idx in refs.get(idxdef,[]) if heads[0] < idx < defval[0]]
+                for idx in sites :      # all found before retargeting, which resets the table
+                    ExecList[idx][PFA] = defval[0]
+                    nbrepleff += 1
+                for rec in InlineList[:] :  # inlined copies of old defs: call to last def instead
+                    if rec[2] != defval[0] and ExecList[rec[2]] == [Def,tos()] :
+                        ExecList[rec[0]] = [doCall,defval[0]]
+                        for i in range(rec[0]+1,rec[1]) :
+                            ExecList[i] = [k_pass,'inline']     # no op, keeps indexes unchanged
+                        InlineList.remove(rec)
+                        nbrepleff += 1
                 print('  Replaced in',nbrepleff,'definitions')
+                closreset()                 # calls retargeted, compile closures again
+                StackEffects.clear()        # effects of callers may have changed
                 k_drop()
 #
 #============================
 #
+def k_compact():            # ( -- ) remove old definitions no longer used from ExecList
+    size = len(ExecList)
+    nbdefs,nbentries = compact()
+    if nbentries :
+        print('  Removed',nbdefs,'unreachable definitions,',nbentries,'entries ; ExecList from',size,'to',len(ExecList),'entries')
+    else:
+        print('  Nothing to remove')
+#
+#============================
+#
+def k_effect():             # ( defname -- ) print the stack effect of defname, if verified
+    if len(dstack) < 1 :
+        abort('Missing argument for "effect"')
+    elif not isinstance(tos(),str):
+        abort('Argument for "effect" must be a string')
+    else:
+        defval = CoreDef.get(tos(),None)
+        if defval :
+            eff = stackeffect(defval[0])
+            if eff :
+                print(tos(),'( '+str(eff[0])+' -- '+str(eff[0]+eff[1])+' )')
+            else:
+                print(tos(),'stack effect not verifiable')
+            k_drop()
+        else:
+            abort('Definition "'+tos()+'" not found')
+#
+#============================
+#
 def k_str():                # ( item -- str  ) return a string interpretation of item
     if len(dstack) < 1 :
         abort('Missing argument for "str"')
@@ -4311,24 +7028,60 @@ CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 def fatal_error() :
     print('>>>Fatal error , execution index out of range 0:' + str(len(ExecList)))
     print('>>>Last IP:',IP)
-    input('>>>Press any key to quit or any other to continue :)))')
+    if Batch is None :
+        input('>>>Press any key to quit or any other to continue :)))')
 #
 #============================
 #============================
 #
 # start RPPy
 #
-print('Welcome to Reverse Polish Python - RPPy')
-print('  Version '+ str(veryy) + '.'+str(vermm) + ' (yy.mm)')
-print('  Type "intro .(Enter)" for introduction, "help .(Enter)" for help,')
-print('  "license .(Enter)" for license')
-print('  Press Ctrl-Q at line input or "quit .(Enter)" to exit RPPy')
-print()
-#
-while IP < len(ExecList) :
-    NEXT()
-fatal_error()
-exit(1)
+ExecList = CodeList(ExecList)   # initial XT names to function references
+#
+if __name__ == '__main__' :     # imported by a transpiled module: VM only, no REPL
+#
+#   command line options:
+#       -t filename     transpile words saved in filename.rpp to python module filename.py
+#       -f script       run script in batch mode: no prompts, no data stack printing, exit at
+#                       its end with code 0, or 1 at the first compile error or abort
+#       -i              interactive REPL, even if input is not a terminal
+#   without option, input not a terminal ( rppy.py < script ) is run in batch mode
+#
+    if len(sys.argv) == 3 and sys.argv[1] == '-t' :
+        try:
+            loadimage(sys.argv[2]+'.rpp')
+            print('Transpiled:',transpile(sys.argv[2]),'words to '+sys.argv[2]+'.py')
+            exit(0)
+        except (AttributeError,ValueError,TypeError,SyntaxError,OSError,NameError,EOFError) as e:
+            print('Transpile error:',str(e))
+            exit(1)
+    elif len(sys.argv) == 3 and sys.argv[1] == '-f' :
+        try:
+            Batch = open(sys.argv[2],'r')
+            BatchName = sys.argv[2]
+        except OSError as e:
+            print('Batch error:',str(e))
+            exit(2)
+    elif len(sys.argv) == 1 and not sys.stdin.isatty() :
+        Batch = sys.stdin
+        BatchName = 'standard input'
+    elif len(sys.argv) > 1 and sys.argv[1:] != ['-i'] :
+        print('Usage: rppy.py [-t filename | -f script | -i]')
+        exit(2)
+#
+    if Batch is None :
+        print('Welcome to Reverse Polish Python - RPPy')
+        print('  Version '+ str(veryy) + '.'+str(vermm) + ' (yy.mm)')
+        print('  Type "intro .(Enter)" for introduction, "help .(Enter)" for help,')
+        print('  "license .(Enter)" for license')
+        print('  Press Ctrl-Q at line input or "quit .(Enter)" to exit RPPy')
+        print()
+    else:
+        switchpds = 0           # data stack printed only by "pds" in scripts
+#
+    driver()
+    fatal_error()
+    exit(1)
 
 
 #====
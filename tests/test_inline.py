@@ -0,0 +1,45 @@
+"""Regression tests of RPPy, run as batch scripts: rppy.py -f script"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+RPPY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rppy.py')
+
+
+def run_script(lines):
+    """Run the RPPy script made of lines, return (exit code, output)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'script.in')
+        with open(script, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        proc = subprocess.run([sys.executable, RPPY, '-f', script], cwd=tmp,
+                              capture_output=True, text=True, timeout=60)
+    return proc.returncode, proc.stdout
+
+
+class TestInline(unittest.TestCase):
+
+    def test_assignment_after_inlining(self):
+        # the literal "=" writes must not be copied into callers
+        code, out = run_script(['inc: 1 + ; .',
+                                'out: inc 0 + ; .',
+                                '5 *inc = .',
+                                '10 out print .'])
+        self.assertEqual(code, 0, out)
+        self.assertEqual(out.split(), ['15'])
+
+    def test_inline_mark_of_new_definition(self):
+        # a definition compiled again without "inline" is called, not copied
+        code, out = run_script(['f: dup + ; inline .',
+                                'f: dup * ; .',
+                                'g: f ; .',
+                                '3 g print .'])
+        self.assertEqual(code, 0, out)
+        self.assertEqual(out.split(), ['9'])
+
+
+if __name__ == '__main__':
+    unittest.main()